@@ -0,0 +1,103 @@
+"""Compara el tamaño BSON y la latencia de codificación de `productos`
+guardado como lista de documentos frente a "columnar-zstd".
+
+Uso:
+    python -m benchmarks.columnar_codec --lines 100 500 2000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+import bson
+from services.columnar_codec import ENCODING_COLUMNAR_ZSTD, ENCODING_NONE, decode_document, encode_document
+
+MARCAS = ["AUMA", "MSA", "VALMET", "FISHER", "ROSEMOUNT"]
+FAMILIAS = ["Actuadores", "Válvulas", "Detectores", "Transmisores"]
+DEPARTAMENTOS = ["UN VA", "UN AI", "UN SE"]
+
+
+def build_productos(lines: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    productos = []
+    for item in range(1, lines + 1):
+        compra = round(rng.uniform(50, 5000), 2)
+        venta = round(compra * rng.uniform(1.1, 1.6), 2)
+        cantidad = float(rng.randint(1, 20))
+        productos.append({
+            "num_item": str(item),
+            "marca": rng.choice(MARCAS),
+            "codigo_completo": f"{rng.randint(100000, 999999)}-{rng.choice('ABCDEF')}{rng.randint(10, 99)}",
+            "familia": rng.choice(FAMILIAS),
+            "departamento": rng.choice(DEPARTAMENTOS),
+            "cantidad": cantidad,
+            "descuento_stf": round(rng.uniform(0, 0.4), 4),
+            "descuento_cisac": round(rng.uniform(0, 0.2), 4),
+            "margen": round(rng.uniform(0.05, 0.45), 4),
+            "fact_importacion": round(rng.uniform(1.0, 1.3), 4),
+            "costo_importacion": round(compra * 0.1, 2),
+            "total_c_fijos": round(rng.uniform(0, 200), 2),
+            "total_c_extras": round(rng.uniform(0, 100), 2),
+            "dias_fabricacion": rng.randint(5, 120),
+            "peso_unva": round(rng.uniform(1, 500), 2) if item % 3 == 0 else None,
+            "tiempo_unva": round(rng.uniform(1, 60), 2) if item % 3 == 0 else None,
+            "moneda": rng.choice(["USD", "EUR", "PEN"]),
+            "precio_compra": compra,
+            "precio_compra_2": round(compra * 0.95, 2),
+            "precio_venta": venta,
+            "total": round(venta * cantidad, 2),
+        })
+    return productos
+
+
+def build_document(lines: int) -> dict:
+    return {
+        "history_id": "0" * 24,
+        "num_deal": "12345",
+        "num_oferta": "COT-1234-0",
+        "revision": "0",
+        "cliente": "Cliente 1 S.A.C.",
+        "nombre_archivo": "cotizacion.xlsx",
+        "productos": build_productos(lines),
+        "total_productos": lines,
+    }
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def measure(doc: dict, encoding: str, repeat: int) -> dict:
+    encoded = bson.encode(encode_document(doc, encoding))
+    return {
+        "bytes": len(encoded),
+        "encode_ms": best_of(repeat, lambda: bson.encode(encode_document(doc, encoding))),
+        "decode_ms": best_of(repeat, lambda: decode_document(bson.decode(encoded))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codificación de productos")
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'líneas':>7} {'codificación':>14} {'bytes':>10} {'ratio':>6} {'encode ms':>10} {'decode ms':>10}")
+    for lines in args.lines:
+        doc = build_document(lines)
+        baseline = measure(doc, ENCODING_NONE, args.repeat)
+        for encoding, result in ((ENCODING_NONE, baseline), (ENCODING_COLUMNAR_ZSTD, measure(doc, ENCODING_COLUMNAR_ZSTD, args.repeat))):
+            ratio = result["bytes"] / baseline["bytes"]
+            print(
+                f"{lines:>7} {encoding:>14} {result['bytes']:>10} {ratio:>6.2f} "
+                f"{result['encode_ms']:>10.2f} {result['decode_ms']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compara el cuerpo de POST /api/processed-excels en filas y en columnas:
+bytes enviados (con y sin gzip) y tiempo de parseo + validación hasta el
+documento que se guarda.
+
+Uso:
+    python -m benchmarks.columnar_payload --lines 500 2000
+"""
+
+import argparse
+import gzip
+import json
+import time
+from typing import Callable
+from pydantic import TypeAdapter
+from benchmarks.columnar_codec import build_document
+from models.processed_products_model import ProductosColumnas
+from routes.processed_excel_routes import ProcessedExcelInput
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def to_document(model) -> dict:
+    if hasattr(model, "to_document"):
+        return model.to_document()
+    return model.model_dump(exclude_unset=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del formato columnar de productos")
+    parser.add_argument("--lines", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(ProcessedExcelInput)
+    print(f"{'líneas':>7} {'formato':>9} {'bytes':>10} {'gzip':>9} {'validación ms':>14} {'ratio':>6}")
+    for lines in args.lines:
+        rows = build_document(lines)
+        columns = {**rows, "productos": ProductosColumnas.columns_from_rows(rows["productos"])}
+        results = []
+        for label, payload in (("filas", rows), ("columnas", columns)):
+            body = json.dumps(payload).encode("utf-8")
+            # Mismo camino que FastAPI: json.loads y validación del modelo del cuerpo
+            elapsed = best_of(args.repeat, lambda: to_document(adapter.validate_python(json.loads(body))))
+            results.append((label, len(body), len(gzip.compress(body)), elapsed))
+        assert to_document(adapter.validate_python(rows)) == to_document(adapter.validate_python(columns))
+        baseline = results[0][3]
+        for label, size, gz_size, elapsed in results:
+            print(f"{lines:>7} {label:>9} {size:>10} {gz_size:>9} {elapsed:>14.2f} {baseline / elapsed:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
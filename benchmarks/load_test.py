@@ -0,0 +1,382 @@
+"""Prueba de carga de la API completa contra un MongoDB local.
+
+Levanta `main.app` en el mismo proceso (con su lifespan), con el
+almacenamiento local en un directorio temporal, siembra historial,
+processed_excels, productos, empleados y usuarios, y ejecuta una mezcla
+ponderada de peticiones: listados, búsquedas, estadísticas, exportación,
+login y generación de reportes. Al final imprime throughput y latencias
+p50/p95/p99 por endpoint.
+
+Las peticiones viajan por httpx.ASGITransport (requiere httpx), sin red: las
+cifras corresponden a un solo proceso de la API (un dyno con un worker).
+
+MongoDB:
+    --mongodb-url mongodb://localhost:27018   mongod efímero, p. ej.
+        mongod --dbpath "$(mktemp -d)" --port 27018
+    --mongodb-url mongomock://                réplica en memoria (requiere
+        mongomock-motor; las latencias de Mongo no son representativas)
+
+La base de datos de destino debe estar vacía; nunca se apunta a producción.
+
+Uso:
+    python -m benchmarks.load_test --duration 60 --concurrency 16
+    python -m benchmarks.load_test --mongodb-url mongomock:// --history 500 --json resultado.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+MOCK_URL_PREFIX = "mongomock://"
+PASSWORD = "carga123"
+
+# nombre -> peso relativo en la mezcla
+WORKLOAD = {
+    "history_list": 20,
+    "history_search": 10,
+    "history_detail": 10,
+    "history_statistics": 5,
+    "products_list": 10,
+    "products_search": 5,
+    "employees_list": 5,
+    "line_items_search": 10,
+    "export_stats": 5,
+    "export": 2,
+    "login": 3,
+    "report_generate": 1,
+}
+
+MARCAS = ["AUMA", "MSA", "VALMET", "FISHER", "ROSEMOUNT"]
+TIPOS_OPERACION = ["cotizacion", "revision", "pedido"]
+UNIDADES_NEGOCIO = ["UN VA", "UN AI", "UN SE"]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LoadState:
+    """Datos sembrados que usan los escenarios para armar las peticiones"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.history_ids: List[str] = []
+        self.num_deals: List[str] = []
+        self.product_names: List[str] = []
+        self.employee_names: List[str] = []
+        self.usuarios: List[str] = []
+        self.quote_path: str = ""
+
+
+async def _post(client, url: str, **kwargs) -> dict:
+    response = await client.post(url, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f"Error al sembrar {url}: {response.status_code} {response.text[:200]}")
+    return response.json()
+
+
+async def seed(client, state: LoadState, args) -> Dict[str, int]:
+    """Sembrar a través de la propia API para respetar validaciones e índices"""
+    from benchmarks.columnar_codec import build_productos
+
+    rng = state.rng
+    for index in range(args.usuarios):
+        iniciales = f"C{chr(65 + index // 26 % 26)}{chr(65 + index % 26)}"
+        await _post(client, "/api/register", json={
+            "nombre": f"Usuario {index}",
+            "apellido": "Carga",
+            "iniciales": iniciales,
+            "es_lider": index == 0,
+            "webhook_bitrix": "https://bitrix.example.com/webhook/carga",
+            "contrasena": PASSWORD,
+        })
+        state.usuarios.append(iniciales)
+
+    for index in range(args.employees):
+        nombre = f"Empleado {index} {rng.choice(['García', 'Pérez', 'Quispe', 'Rojas'])}"
+        await _post(client, "/api/employees", json={"codigo": index + 1, "nombre": nombre, "activo": index % 10 != 0})
+        state.employee_names.append(nombre)
+
+    for index in range(args.products):
+        name = f"{rng.choice(MARCAS)} modelo {index}"
+        await _post(client, "/api/products", json={
+            "code": 100000 + index,
+            "name_excel": name,
+            "unidad_negocio": rng.choice(UNIDADES_NEGOCIO),
+            "area1": rng.randint(1, 9),
+        })
+        state.product_names.append(name)
+
+    for index in range(args.history):
+        num_deal = str(20000 + index)
+        entry = await _post(client, "/api/history", json={
+            "num_deal": num_deal,
+            "nombre_oferta": f"Oferta {num_deal}",
+            "preparado": rng.choice(state.usuarios or ["CG"]),
+            "responsable": rng.choice(state.usuarios or ["CG"]),
+            "usuario_envio": rng.choice(state.usuarios or ["CG"]),
+            "utilidad": round(rng.uniform(0.05, 0.4), 4),
+            "costo_auma": round(rng.uniform(0, 50000), 2),
+            "costo_msa": round(rng.uniform(0, 20000), 2),
+            "costo_valmet": round(rng.uniform(0, 20000), 2),
+            "total_productos": args.lines,
+            "tipo_operacion": rng.choice(TIPOS_OPERACION),
+            "nombre_archivo": f"cotizacion_{num_deal}.xlsx",
+            "fecha_cierre_modificada": False,
+            "estado": "exitoso",
+        })
+        state.history_ids.append(entry["_id"])
+        state.num_deals.append(num_deal)
+        if index < args.processed_excels:
+            await _post(client, "/api/processed-excels", json={
+                "history_id": entry["_id"],
+                "num_deal": num_deal,
+                "num_oferta": f"COT-{index}",
+                "revision": "0",
+                "cliente": f"Cliente {index % 200} S.A.C.",
+                "nombre_archivo": f"cotizacion_{num_deal}.xlsx",
+                "productos": build_productos(args.lines, seed=index),
+                "total_productos": args.lines,
+            })
+
+    return {
+        "usuarios": args.usuarios,
+        "employees": args.employees,
+        "productos": args.products,
+        "historial": args.history,
+        "processed_excels": min(args.processed_excels, args.history),
+        "processed_products": min(args.processed_excels, args.history) * args.lines,
+    }
+
+
+def scenarios(state: LoadState) -> Dict[str, Callable]:
+    rng = state.rng
+
+    def history_list(client):
+        return client.get("/api/history", params={"limit": 50, "skip": rng.randint(0, max(0, len(state.history_ids) - 50))})
+
+    def history_search(client):
+        return client.get("/api/history", params={"search": rng.choice(state.num_deals)[:3]})
+
+    def history_detail(client):
+        return client.get(f"/api/history/{rng.choice(state.history_ids)}")
+
+    def history_statistics(client):
+        return client.get("/api/history/statistics")
+
+    def products_list(client):
+        return client.get("/api/products", params={"limit": 100, "skip": rng.randint(0, max(0, len(state.product_names) - 100))})
+
+    def products_search(client):
+        return client.get("/api/products", params={"search": rng.choice(state.product_names).split()[0]})
+
+    def employees_list(client):
+        return client.get("/api/employees", params={"search": rng.choice(state.employee_names).split()[-1]})
+
+    def line_items_search(client):
+        return client.get("/api/processed-excels/productos", params={"marca": rng.choice(MARCAS), "limit": 100})
+
+    def export_stats(client):
+        return client.get("/api/processed-excels/export/stats")
+
+    def export(client):
+        return client.get("/api/processed-excels/export", params={"marca": rng.choice(MARCAS)})
+
+    def login(client):
+        return client.post("/api/login", json={"iniciales": rng.choice(state.usuarios), "contrasena": PASSWORD})
+
+    def report_generate(client):
+        with open(state.quote_path, "rb") as f:
+            content = f.read()
+        return client.post(
+            "/api/reports/generate",
+            params={"force": "true"},
+            files=[("files", ("carga.xlsx", content, "application/octet-stream"))]
+        )
+
+    return {
+        "history_list": history_list,
+        "history_search": history_search,
+        "history_detail": history_detail,
+        "history_statistics": history_statistics,
+        "products_list": products_list,
+        "products_search": products_search,
+        "employees_list": employees_list,
+        "line_items_search": line_items_search,
+        "export_stats": export_stats,
+        "export": export,
+        "login": login,
+        "report_generate": report_generate,
+    }
+
+
+async def run_workload(client, state: LoadState, weights: Dict[str, int], args) -> Tuple[Dict[str, list], float]:
+    available = scenarios(state)
+    names = [name for name in weights if weights[name] > 0]
+    cumulative = [weights[name] for name in names]
+    samples: Dict[str, list] = {name: [] for name in names}
+    deadline = time.perf_counter() + args.duration
+    remaining = {"requests": args.requests}
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            if args.requests:
+                if remaining["requests"] <= 0:
+                    return
+                remaining["requests"] -= 1
+            name = state.rng.choices(names, weights=cumulative)[0]
+            start = time.perf_counter()
+            try:
+                response = await available[name](client)
+                status = response.status_code
+            except Exception:
+                status = 599
+            samples[name].append((time.perf_counter() - start, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples: Dict[str, list], elapsed: float) -> List[dict]:
+    rows = []
+    for name, values in samples.items():
+        if not values:
+            continue
+        latencies = sorted(latency * 1000 for latency, _ in values)
+        rows.append({
+            "endpoint": name,
+            "requests": len(values),
+            "errors": sum(1 for _, status in values if status >= 400),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+        })
+    return rows
+
+
+def print_summary(rows: List[dict], elapsed: float):
+    print(f"{'endpoint':<22} {'req':>6} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for row in rows:
+        print(
+            f"{row['endpoint']:<22} {row['requests']:>6} {row['errors']:>5} {row['rps']:>8.2f} "
+            f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}"
+        )
+    total = sum(row["requests"] for row in rows)
+    print(f"Total: {total} peticiones en {elapsed:.1f} s ({total / elapsed:.2f} req/s)")
+
+
+def parse_weights(values: List[str]) -> Dict[str, int]:
+    weights = dict(WORKLOAD)
+    for value in values:
+        name, _, weight = value.partition("=")
+        if name not in WORKLOAD or not weight.isdigit():
+            raise SystemExit(f"Peso inválido '{value}'; use nombre=entero con uno de: {', '.join(WORKLOAD)}")
+        weights[name] = int(weight)
+    return weights
+
+
+def configure_environment(args, workdir: str):
+    """Variables de entorno que lee config.Settings; deben fijarse antes de importar la app"""
+    os.environ["MONGODB_URL"] = args.mongodb_url
+    os.environ["MONGODB_DB_NAME"] = args.db_name
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["LOCAL_STORAGE_PATH"] = os.path.join(workdir, "storage")
+    os.environ.setdefault("SECRET_KEY", "carga-local")
+
+
+def install_mock_client():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("mongomock:// requiere el paquete mongomock-motor")
+    import database
+
+    database.AsyncIOMotorClient = lambda url, **kwargs: AsyncMongoMockClient()
+
+
+async def main_async(args) -> int:
+    import httpx
+    from benchmarks.synthetic_quote import write_quote
+    from database import close_mongo_connection, connect_to_mongo, get_database
+    from main import app
+
+    weights = parse_weights(args.weight)
+    state = LoadState(args.seed)
+    state.quote_path = write_quote(
+        os.path.join(args.workdir, "carga.xlsx"),
+        args.report_lines
+    )
+
+    # Antes del lifespan: al iniciar, la app crea índices y documentos propios
+    await connect_to_mongo()
+    try:
+        existing = await get_database().list_collection_names()
+    finally:
+        await close_mongo_connection()
+    if existing:
+        print(f"La base de datos '{args.db_name}' no está vacía; use --db-name con una base nueva")
+        return 2
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://carga", timeout=None) as client:
+            start = time.perf_counter()
+            seeded = await seed(client, state, args)
+            print(f"Sembrado en {time.perf_counter() - start:.1f} s: {seeded}")
+
+            samples, elapsed = await run_workload(client, state, weights, args)
+
+    rows = summarize(samples, elapsed)
+    print_summary(rows, elapsed)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"seeded": seeded, "elapsed_seconds": round(elapsed, 2), "concurrency": args.concurrency, "endpoints": rows},
+                f,
+                indent=2
+            )
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API con MongoDB local")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="quotizador_carga")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--requests", type=int, default=0, help="Detener tras N peticiones (0 = solo duración)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--history", type=int, default=2000)
+    parser.add_argument("--processed-excels", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=40, help="Líneas por Excel procesado")
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--employees", type=int, default=300)
+    parser.add_argument("--usuarios", type=int, default=5)
+    parser.add_argument("--report-lines", type=int, default=200, help="Líneas de la cotización de generate")
+    parser.add_argument("--weight", nargs="+", default=[], help="Ajustar la mezcla, p. ej. login=0 export=5")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Guardar el resumen en un archivo JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, "storage"))
+        args.workdir = workdir
+        configure_environment(args, workdir)
+        if args.mongodb_url.startswith(MOCK_URL_PREFIX):
+            install_mock_client()
+        return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Suite de benchmarks del parser de cotizaciones con líneas base guardadas.
+
+Mide `get_df`, `convert_df_to_db_format`, `process_multiple_files` y la
+escritura del XLSX del reporte sobre cotizaciones sintéticas de varios
+tamaños, y compara cada caso con `baselines.json`. Termina con código 1 si
+algún caso supera su línea base en más de la tolerancia; los casos que la
+superan se vuelven a medir una vez antes de darlos por regresión, para no
+fallar por ruido puntual de la máquina.
+
+Las líneas base dependen de la máquina: regenérelas con --update en el mismo
+entorno donde se ejecutará la comparación.
+
+Uso:
+    python -m benchmarks.parser_suite
+    python -m benchmarks.parser_suite --only get_df --repeat 5
+    python -m benchmarks.parser_suite --update
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from io import BytesIO
+from typing import Callable, Dict, List, Tuple
+import pandas as pd
+from benchmarks.synthetic_quote import write_quote
+from services.excel_processor import excel_processor, get_df
+from services.excel_utils import convert_df_to_db_format
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TOLERANCE = 0.3
+
+PARSE_SIZES = (100, 1000, 3000)
+BATCH_FILES = 4
+BATCH_LINES = 500
+REPORT_SIZES = (1000, 10000)
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def write_report(dataframe: pd.DataFrame):
+    # Igual que ReportController._upload_output, sin la subida
+    output = BytesIO()
+    dataframe.to_excel(output, index=False, engine="openpyxl")
+    return output
+
+
+def build_cases(workdir: str) -> List[Tuple[str, Callable[[], object]]]:
+    cases = []
+    quotes = {}
+    for lines in PARSE_SIZES:
+        variant = 233 if lines < 500 else 350
+        path = write_quote(os.path.join(workdir, f"quote_{lines}.xlsx"), lines, variant=variant, seed=lines)
+        quotes[lines] = path
+        cases.append((f"get_df[{lines}]", lambda path=path: get_df(path)))
+
+    for lines, path in quotes.items():
+        df = get_df(path)
+        cases.append((f"convert_df_to_db_format[{lines}]", lambda df=df, path=path: convert_df_to_db_format(df, path)))
+
+    batch = [
+        write_quote(
+            os.path.join(workdir, f"batch_{index}.xlsx"),
+            BATCH_LINES,
+            variant=(233, 350)[index % 2],
+            seed=index
+        )
+        for index in range(BATCH_FILES)
+    ]
+    cases.append((
+        f"process_multiple_files[{BATCH_FILES}x{BATCH_LINES}]",
+        lambda: excel_processor.process_multiple_files(batch)
+    ))
+
+    base = get_df(quotes[max(PARSE_SIZES)])
+    for rows in REPORT_SIZES:
+        repeats = -(-rows // len(base))
+        report = pd.concat([base] * repeats, ignore_index=True).iloc[:rows]
+        cases.append((f"report_write[{rows}]", lambda report=report: write_report(report)))
+    return cases
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baselines() -> dict:
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(results: Dict[str, float], previous: dict, tolerance: float):
+    cases = dict(previous.get("cases", {}))
+    cases.update({name: round(ms, 2) for name, ms in results.items()})
+    with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+        json.dump(
+            {"tolerance": tolerance, "environment": environment(), "cases": cases},
+            f,
+            indent=2,
+            sort_keys=True
+        )
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks del parser con detección de regresiones")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", default=[], help="Prefijos de los casos a ejecutar")
+    parser.add_argument("--tolerance", type=float, default=None, help="Margen sobre la línea base (0.3 = +30%%)")
+    parser.add_argument("--update", action="store_true", help="Guardar los resultados como nuevas líneas base")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    tolerance = args.tolerance if args.tolerance is not None else baselines.get("tolerance", DEFAULT_TOLERANCE)
+    if baselines.get("environment") and baselines["environment"] != environment():
+        print(f"Aviso: líneas base medidas en {baselines['environment']}, entorno actual {environment()}")
+
+    results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = [
+            (name, func) for name, func in build_cases(workdir)
+            if not args.only or name.startswith(tuple(args.only))
+        ]
+        print(f"{'caso':<40} {'ms':>10} {'base ms':>10} {'ratio':>7}")
+        for name, func in cases:
+            ms = best_of(args.repeat, func)
+            results[name] = ms
+            baseline = baselines.get("cases", {}).get(name)
+            if baseline is None:
+                print(f"{name:<40} {ms:>10.2f} {'-':>10} {'-':>7}")
+                continue
+            if ms / baseline > 1 + tolerance:
+                ms = results[name] = min(ms, best_of(args.repeat, func))
+            ratio = ms / baseline
+            flag = ""
+            if ratio > 1 + tolerance:
+                regressions.append(name)
+                flag = "  REGRESIÓN"
+            print(f"{name:<40} {ms:>10.2f} {baseline:>10.2f} {ratio:>7.2f}{flag}")
+
+    if args.update:
+        save_baselines(results, baselines, tolerance)
+        print(f"Líneas base actualizadas en {BASELINES_PATH}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} caso(s) superan la línea base en más de {tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
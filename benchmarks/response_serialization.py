@@ -0,0 +1,91 @@
+"""Compara la ruta de respuesta anterior de `/api/processed-excels/history/{id}`
+(reconstruir ProcessedExcelResponse y serializar con FastAPI) con la ruta
+rápida (`trusted_dump` + FastJSONResponse), sobre una cotización sintética.
+
+Uso:
+    python -m benchmarks.response_serialization --lines 2000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from benchmarks.columnar_codec import build_document
+from models.processed_products_model import ProcessedExcelResponse
+from services.fast_json import FastJSONResponse, trusted_dump
+
+
+def build_app(stored: dict) -> FastAPI:
+    app = FastAPI()
+    fast_app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/model", response_model=ProcessedExcelResponse)
+    async def model_route():
+        # Antes: validación completa de cada línea y serialización de FastAPI
+        return ProcessedExcelResponse(**dict(stored))
+
+    @app.get("/trusted", response_model=ProcessedExcelResponse)
+    async def trusted_route():
+        return FastJSONResponse(trusted_dump(ProcessedExcelResponse, dict(stored)))
+
+    @app.get("/dict-json")
+    async def dict_route():
+        return trusted_dump(ProcessedExcelResponse, dict(stored))
+
+    @fast_app.get("/dict-orjson")
+    async def dict_orjson_route():
+        return trusted_dump(ProcessedExcelResponse, dict(stored))
+
+    app.mount("/fast", fast_app)
+    return app
+
+
+async def time_route(client: httpx.AsyncClient, path: str, repeat: int) -> tuple:
+    body = (await client.get(path)).content
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, body
+
+
+async def run(lines: int, repeat: int):
+    stored = build_document(lines)
+    stored["_id"] = "6a0000000000000000000000"
+    stored["created_at"] = datetime(2026, 1, 1, 12, 0, 0)
+    app = build_app(stored)
+
+    routes = [
+        ("/model", "modelo Pydantic + response_model (antes)"),
+        ("/trusted", "trusted_dump + FastJSONResponse (después)"),
+        ("/dict-json", "dict + JSONResponse por defecto"),
+        ("/fast/dict-orjson", "dict + FastJSONResponse por defecto"),
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = [(path, label, *await time_route(client, path, repeat)) for path, label in routes]
+
+    reference = results[0][3]
+    baseline = results[0][2]
+    print(f"Cotización de {lines} líneas, mediana de {repeat} peticiones")
+    for path, label, median_ms, body in results:
+        same = "sí" if body == reference else "no"
+        print(f"{label:<45} {median_ms:>8.2f} ms  x{baseline / median_ms:>5.2f}  mismo JSON: {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de respuestas")
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args.lines, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Generador de cotizaciones sintéticas con el formato que espera `get_df`.
+
+Las cotizaciones reales son confidenciales; este módulo produce libros con la
+misma estructura: fila de encabezado real marcada por 'Factor STD' == "Precio Lista",
+columnas duplicadas ('Marca', 'Qty', 'STF'), filas auxiliares de 'UN VA' con peso
+y tiempo en 'Precio Neto', y los datos del deal en las filas 233/234/238 o
+350/351/355 según la variante.
+
+Uso:
+    python -m benchmarks.synthetic_quote salida.xlsx --lines 500 --variant 350
+"""
+
+import argparse
+import random
+from typing import List, Optional
+from openpyxl import Workbook
+
+TOTAL_COLUMNS = 113
+HEADER_ROW = 5
+DEAL_COLUMN = 112
+CLIENT_COLUMN = 70
+ANCHOR_ROWS = {233: (233, 234, 238), 350: (350, 351, 355)}
+
+# Encabezado real de la cotización (posición -> nombre)
+QUOTE_HEADER = [
+    "#Item", "Marca", "Código", "Familia", "Departamento", "Qty", "Qty",
+    "STF", "STF", "Marca", "Precio Lista", "Margen Total %", "F.Importación",
+    "Costo importación", "Total Costos Fijos", "Aplicativos", "WD", "Moneda1",
+    "Precio Lista Unitario", "Precio Compra Unitario", "Precio Neto", "Desc. CISAC",
+    "Precio Unitario Final", "Precio Total Final",
+]
+COL = {}
+for _position, _name in enumerate(QUOTE_HEADER):
+    COL.setdefault(_name, _position)
+FACTOR_STD_COLUMN = QUOTE_HEADER.index("Precio Lista")
+# Segunda columna 'Marca' del encabezado (la duplicada)
+SECOND_MARCA_COLUMN = QUOTE_HEADER.index("Marca", COL["Marca"] + 1)
+
+MARCAS = ["AUMA", "MSA", "VALMET", "FISHER", "ROSEMOUNT"]
+FAMILIAS = ["Actuadores", "Válvulas", "Detectores", "Transmisores"]
+DEPARTAMENTOS = ["UN VA", "UN AI", "UN SE"]
+UNVA_ROWS = 6
+
+
+def _empty_row() -> List[Optional[object]]:
+    return [None] * TOTAL_COLUMNS
+
+
+def _item_row(rng: random.Random, item: int, departamento: str) -> List[Optional[object]]:
+    row = _empty_row()
+    qty = rng.randint(1, 20)
+    lista = round(rng.uniform(50, 5000), 2)
+    compra = round(lista * rng.uniform(0.5, 0.9), 2)
+    venta = round(compra * rng.uniform(1.1, 1.6), 2)
+    row[COL["#Item"]] = str(item)
+    row[COL["Marca"]] = rng.choice(MARCAS)
+    row[COL["Código"]] = f"{rng.randint(100000, 999999)}-{rng.choice('ABCDEF')}{rng.randint(10, 99)}"
+    row[COL["Familia"]] = rng.choice(FAMILIAS)
+    row[COL["Departamento"]] = departamento
+    row[COL["Qty"]] = qty
+    row[COL["Qty"] + 1] = qty
+    row[COL["STF"]] = round(rng.uniform(0, 0.4), 4)
+    row[COL["STF"] + 1] = round(rng.uniform(0, 0.4), 4)
+    row[SECOND_MARCA_COLUMN] = row[COL["Marca"]]
+    row[FACTOR_STD_COLUMN] = round(rng.uniform(0.8, 1.2), 4)
+    row[COL["Margen Total %"]] = round(rng.uniform(0.05, 0.45), 4)
+    row[COL["F.Importación"]] = round(rng.uniform(1.0, 1.3), 4)
+    row[COL["Costo importación"]] = round(compra * 0.1, 2)
+    row[COL["Total Costos Fijos"]] = round(rng.uniform(0, 200), 2)
+    row[COL["Aplicativos"]] = round(rng.uniform(0, 100), 2)
+    row[COL["WD"]] = rng.randint(5, 120)
+    row[COL["Moneda1"]] = rng.choice(["USD", "EUR", "PEN"])
+    row[COL["Precio Lista Unitario"]] = lista
+    row[COL["Precio Compra Unitario"]] = compra
+    row[COL["Precio Neto"]] = round(compra * 0.95, 2)
+    row[COL["Desc. CISAC"]] = round(rng.uniform(0, 0.2), 4)
+    row[COL["Precio Unitario Final"]] = venta
+    row[COL["Precio Total Final"]] = round(venta * qty, 2)
+    return row
+
+
+def build_rows(lines: int, variant: int = 233, seed: int = 0) -> List[List[Optional[object]]]:
+    """Filas del DataFrame que leerá `pd.read_excel` (sin la fila de encabezado)"""
+    rng = random.Random(seed)
+    rows = [_empty_row() for _ in range(HEADER_ROW)]
+
+    header = _empty_row()
+    header[:len(QUOTE_HEADER)] = QUOTE_HEADER
+    rows.append(header)
+
+    for item in range(1, lines + 1):
+        departamento = DEPARTAMENTOS[item % len(DEPARTAMENTOS)]
+        rows.append(_item_row(rng, item, departamento))
+        if departamento == "UN VA":
+            extra = [_empty_row() for _ in range(UNVA_ROWS)]
+            extra[1][COL["Precio Neto"]] = round(rng.uniform(1, 500), 2)
+            extra[5][COL["Precio Neto"]] = round(rng.uniform(1, 60), 2)
+            rows.extend(extra)
+        if item % 25 == 0:
+            subtotal = _empty_row()
+            subtotal[COL["#Item"]] = "Subtotal"
+            subtotal[COL["Precio Compra Unitario"]] = "*"
+            rows.append(subtotal)
+
+    deal_row, oferta_row, client_row = ANCHOR_ROWS[variant]
+    while len(rows) <= max(client_row, 238):
+        rows.append(_empty_row())
+
+    rows[deal_row][DEAL_COLUMN] = f"{rng.randint(10000, 99999)}"
+    rows[oferta_row][DEAL_COLUMN] = f"COT-{rng.randint(1000, 9999)}-{rng.randint(0, 5)}"
+    rows[client_row][CLIENT_COLUMN] = f"Cliente {rng.randint(1, 500)} S.A.C."
+    if variant == 350:
+        rows[233][DEAL_COLUMN] = None
+    return rows
+
+
+def write_quote(path: str, lines: int, variant: int = 233, seed: int = 0) -> str:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Cotización")
+    sheet.append(
+        ["Factor STD" if col == FACTOR_STD_COLUMN else f"Col{col}" for col in range(TOTAL_COLUMNS)]
+    )
+    for row in build_rows(lines, variant=variant, seed=seed):
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar una cotización sintética")
+    parser.add_argument("output")
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--variant", type=int, choices=sorted(ANCHOR_ROWS), default=233)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_quote(args.output, args.lines, variant=args.variant, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
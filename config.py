@@ -1,16 +1,90 @@
+import logging
 import os
+import secrets
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def _optional_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
 class Settings:
     MONGODB_URL = os.getenv("MONGODB_URL")
     MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME")
+    # Pool y opciones del cliente. Solo se pasan al cliente las definidas: las demás
+    # quedan como las indique MONGODB_URL o, si tampoco, en el default de pymongo
+    MONGODB_MAX_POOL_SIZE = _optional_int("MONGODB_MAX_POOL_SIZE")
+    MONGODB_MIN_POOL_SIZE = _optional_int("MONGODB_MIN_POOL_SIZE")
+    MONGODB_MAX_CONNECTING = _optional_int("MONGODB_MAX_CONNECTING")
+    MONGODB_MAX_IDLE_TIME_MS = _optional_int("MONGODB_MAX_IDLE_TIME_MS")
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = _optional_int("MONGODB_WAIT_QUEUE_TIMEOUT_MS")
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = _optional_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS")
+    MONGODB_CONNECT_TIMEOUT_MS = _optional_int("MONGODB_CONNECT_TIMEOUT_MS")
+    MONGODB_SOCKET_TIMEOUT_MS = _optional_int("MONGODB_SOCKET_TIMEOUT_MS")
+    # Lista separada por comas en orden de preferencia (zstd, snappy, zlib); solo zlib no
+    # requiere paquetes adicionales en el cliente
+    MONGODB_COMPRESSORS = [c.strip() for c in os.getenv("MONGODB_COMPRESSORS", "").split(",") if c.strip()]
+    # primary | primaryPreferred | secondary | secondaryPreferred | nearest
+    MONGODB_READ_PREFERENCE = os.getenv("MONGODB_READ_PREFERENCE") or None
+    MONGODB_APP_NAME = os.getenv("MONGODB_APP_NAME") or None
+    MONGODB_PING_TIMEOUT_SECONDS = float(os.getenv("MONGODB_PING_TIMEOUT_SECONDS", "2"))
     GOOGLE_CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH")
     GOOGLE_STORAGE_BUCKET = os.getenv("GOOGLE_STORAGE_BUCKET")
 
     TEMP_FOLDER = "./temp"
     MAX_WORKERS = os.cpu_count() - 1 if os.cpu_count() > 1 else 1
+
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS", "2"))
+
+    SECRET_KEY = os.getenv("SECRET_KEY")
+    # Solo para desarrollo local: sin SECRET_KEY usar una clave aleatoria por proceso
+    # (los tokens y URLs firmadas no valen en otros procesos ni tras reiniciar)
+    ALLOW_EPHEMERAL_SECRET_KEY = os.getenv("ALLOW_EPHEMERAL_SECRET_KEY", "false").lower() == "true"
+    ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "720"))
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+    USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+    USER_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("USER_CACHE_VERSION_CHECK_SECONDS", "5"))
+    # Sin change stream activo, cada cuánto comparar cantidad y última modificación del catálogo
+    PRODUCT_CATALOG_CHECK_SECONDS = float(os.getenv("PRODUCT_CATALOG_CHECK_SECONDS", "30"))
+    PRODUCT_CATALOG_WATCH_MAX_BACKOFF_SECONDS = float(os.getenv("PRODUCT_CATALOG_WATCH_MAX_BACKOFF_SECONDS", "60"))
+
+    # gcs | local | memory
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+    LOCAL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "./storage")
+    # URL pública del backend; sin ella se usa la de cada petición (detrás de un proxy, con --forwarded-allow-ips)
+    PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "")
+    STORAGE_MAX_WORKERS = int(os.getenv("STORAGE_MAX_WORKERS", "4"))
+    STORAGE_TIMEOUT_SECONDS = int(os.getenv("STORAGE_TIMEOUT_SECONDS", "300"))
+    # Los archivos mayores al umbral se suben en fragmentos con una sesión reanudable
+    STORAGE_RESUMABLE_THRESHOLD_MB = int(os.getenv("STORAGE_RESUMABLE_THRESHOLD_MB", "8"))
+    STORAGE_CHUNK_SIZE_MB = int(os.getenv("STORAGE_CHUNK_SIZE_MB", "8"))
+    # Tamaño a partir del cual el reporte generado pasa de memoria a un temporal anónimo
+    REPORT_SPOOL_MAX_MB = int(os.getenv("REPORT_SPOOL_MAX_MB", "64"))
+    SIGNED_URL_EXPIRATION_SECONDS = int(os.getenv("SIGNED_URL_EXPIRATION_SECONDS", "900"))
+    REPORT_DEDUP_WINDOW_HOURS = int(os.getenv("REPORT_DEDUP_WINDOW_HOURS", "24"))
+    # Días sin cambios tras los que scripts.prune_report_fragments borra los fragmentos de un reporte
+    REPORT_FRAGMENT_RETENTION_DAYS = int(os.getenv("REPORT_FRAGMENT_RETENTION_DAYS", "30"))
+    # Rellenar processed_products al iniciar si el backfill no consta como hecho; si se
+    # desactiva, las búsquedas y exportaciones de líneas responden 503 hasta ejecutar
+    # scripts.backfill_processed_products
+    BACKFILL_PROCESSED_PRODUCTS_ON_STARTUP = os.getenv("BACKFILL_PROCESSED_PRODUCTS_ON_STARTUP", "true").lower() == "true"
+    # "none" guarda productos como lista de documentos; "columnar-zstd" como columnas comprimidas
+    PROCESSED_EXCEL_ENCODING = os.getenv("PROCESSED_EXCEL_ENCODING", "none")
+    PROCESSED_EXCEL_ZSTD_LEVEL = int(os.getenv("PROCESSED_EXCEL_ZSTD_LEVEL", "3"))
+    # Tiempo que un Excel parseado espera en staging a que se confirme con su history_id
+    PARSE_HANDLE_TTL_MINUTES = int(os.getenv("PARSE_HANDLE_TTL_MINUTES", "60"))
+    # Las respuestas menores al umbral se envían sin comprimir
+    GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+    GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "6"))
+    # Archivos cuyo parseo tarde al menos este número de segundos dejan un volcado de cProfile
+    # en profiles/<report_id>/ del almacenamiento; sin valor no se perfila
+    PARSE_PROFILE_THRESHOLD_SECONDS = (
+        float(os.getenv("PARSE_PROFILE_THRESHOLD_SECONDS"))
+        if os.getenv("PARSE_PROFILE_THRESHOLD_SECONDS") else None
+    )
     
     CORS_ORIGINS = [
         "http://localhost:3000",
@@ -19,4 +93,17 @@ class Settings:
 
 settings = Settings()
 
+def require_secret_key() -> str:
+    """Clave para firmar tokens y URLs; falla al iniciar si falta SECRET_KEY"""
+    if not settings.SECRET_KEY:
+        if not settings.ALLOW_EPHEMERAL_SECRET_KEY:
+            raise RuntimeError(
+                "SECRET_KEY no configurada; defínala (o ALLOW_EPHEMERAL_SECRET_KEY=true solo en desarrollo)"
+            )
+        logging.getLogger(__name__).warning(
+            "SECRET_KEY no configurada: se usa una clave aleatoria válida solo en este proceso"
+        )
+        settings.SECRET_KEY = secrets.token_urlsafe(32)
+    return settings.SECRET_KEY
+
 os.makedirs(settings.TEMP_FOLDER, exist_ok=True)
\ No newline at end of file
@@ -1,72 +1,80 @@
 from datetime import datetime
 from typing import Optional
-import bcrypt
 from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from models.usuario_model import UsuarioCreate
-from database import get_database
+from database import create_index, get_database
 from models.usuario_model import UsuarioUpdate, CambiarContrasena
+from services.password_hasher import password_hasher
+from services.token_service import token_service
+from services.user_cache import user_cache
 
 class AuthController:
     def __init__(self):
         self.db = None
         self.collection_name = "usuarios"
+
+    def get_collection(self):
+        if self.db is None:
+            self.db = get_database()
+        return self.db[self.collection_name]
+
+    async def ensure_indexes(self):
+        await create_index(self.get_collection(), "iniciales", unique=True)
     
-    @staticmethod
-    def verificar_contrasena(contrasena_plana: str, contrasena_hash: str) -> bool:
-        try:
-            return bcrypt.checkpw(
-                contrasena_plana.encode('utf-8'),
-                contrasena_hash.encode('utf-8') if isinstance(contrasena_hash, str) else contrasena_hash
-            )
-        except Exception as e:
-            print(f"Error verificando contraseña: {e}")
-            return False
+    async def verificar_contrasena(self, contrasena_plana: str, contrasena_hash: str) -> bool:
+        return await password_hasher.verify(contrasena_plana, contrasena_hash)
     
-    @staticmethod
-    def hashear_contrasena(contrasena: str) -> str:
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(contrasena.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+    async def hashear_contrasena(self, contrasena: str) -> str:
+        return await password_hasher.hash(contrasena)
 
     async def obtener_usuario_por_iniciales(self, iniciales: str) -> Optional[dict]:
-        db = get_database()
-        usuario = await db[self.collection_name].find_one({"iniciales": iniciales.upper()})
+        usuario = await user_cache.get_by_iniciales(iniciales.upper())
+        if usuario:
+            return usuario
+        usuario = await self.get_collection().find_one({"iniciales": iniciales.upper()})
+        if usuario:
+            user_cache.put(usuario)
         return usuario
     
     async def obtener_usuario_por_id(self, usuario_id: str) -> Optional[dict]:
         from bson import ObjectId
-        db = get_database()
         
         try:
-            usuario = await db[self.collection_name].find_one({"_id": ObjectId(usuario_id)})
+            usuario = await user_cache.get_by_id(usuario_id)
+            if usuario:
+                return usuario
+            usuario = await self.get_collection().find_one({"_id": ObjectId(usuario_id)})
+            if usuario:
+                user_cache.put(usuario)
             return usuario
         except Exception:
             return None
     
     async def crear_usuario(self, usuario: UsuarioCreate) -> dict:
-        db = get_database()
-        usuario_existente = await self.obtener_usuario_por_iniciales(usuario.iniciales)
-        if usuario_existente:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Las iniciales ya están en uso"
-            )
-        
         usuario_dict = {
             "nombre": usuario.nombre,
             "apellido": usuario.apellido,
             "iniciales": usuario.iniciales.upper(),
             "es_lider": usuario.es_lider,
             "webhook_bitrix": usuario.webhook_bitrix,
-            "contrasena_hash": self.hashear_contrasena(usuario.contrasena),
+            "contrasena_hash": await self.hashear_contrasena(usuario.contrasena),
             "activo": True,
+            "token_version": 0,
             "fecha_creacion": datetime.utcnow(),
             "fecha_actualizacion": datetime.utcnow()
         }
-        result = await db[self.collection_name].insert_one(usuario_dict)
-        usuario_creado = await db[self.collection_name].find_one({"_id": result.inserted_id})
+        try:
+            await self.get_collection().insert_one(usuario_dict)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Las iniciales ya están en uso"
+            )
+        user_cache.put(usuario_dict)
         
-        return usuario_creado
+        return usuario_dict
     
     async def autenticar_usuario(self, iniciales: str, contrasena: str) -> Optional[dict]:
         usuario = await self.obtener_usuario_por_iniciales(iniciales)
@@ -80,15 +88,57 @@ class AuthController:
                 detail="Usuario inactivo"
             )
         
-        if not self.verificar_contrasena(contrasena, usuario["contrasena_hash"]):
+        if not await self.verificar_contrasena(contrasena, usuario["contrasena_hash"]):
             return None
+
+        if password_hasher.needs_rehash(usuario["contrasena_hash"]):
+            await self._rehashear_contrasena(usuario, contrasena)
         
         return usuario
+
+    async def _rehashear_contrasena(self, usuario: dict, contrasena: str):
+        """Regenerar el hash con el costo configurado tras un login exitoso"""
+        try:
+            nueva_hash = await self.hashear_contrasena(contrasena)
+            await self.get_collection().update_one(
+                {"_id": usuario["_id"], "contrasena_hash": usuario["contrasena_hash"]},
+                {"$set": {"contrasena_hash": nueva_hash}}
+            )
+            usuario["contrasena_hash"] = nueva_hash
+            user_cache.put(usuario)
+            await user_cache.bump_version()
+        except Exception as e:
+            print(f"Error actualizando hash de contraseña: {e}")
+    
+    def crear_token(self, usuario: dict) -> str:
+        return token_service.create_token(usuario)
+
+    async def verificar_token(self, token: str) -> dict:
+        payload = token_service.verify_token(token)
+        # La versión vigente se lee del documento del usuario (vía la caché de usuarios,
+        # que se invalida entre nodos con el documento de versión compartido)
+        usuario = await self.obtener_usuario_por_id(payload["sub"]) if payload else None
+        if (
+            not usuario
+            or not usuario.get("activo", False)
+            or usuario.get("token_version", 0) > payload["ver"]
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido o expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return {
+            "_id": payload["sub"],
+            "iniciales": payload["ini"],
+            "nombre": payload["nom"],
+            "apellido": payload["ape"],
+            "es_lider": payload["lid"],
+        }
     
     async def actualizar_perfil(self, usuario_id: str, datos: UsuarioUpdate) -> dict:
         """Actualizar datos del perfil del usuario"""
         from bson import ObjectId
-        db = get_database()
 
         try:
             # Preparar datos de actualización
@@ -99,21 +149,8 @@ class AuthController:
                 update_data["apellido"] = datos.apellido
             if datos.webhook_bitrix is not None:
                 update_data["webhook_bitrix"] = datos.webhook_bitrix
-
-            # Si hay iniciales nuevas, verificar que no estén en uso
             if datos.iniciales is not None:
-                iniciales_upper = datos.iniciales.upper()
-                usuario_existente = await db[self.collection_name].find_one({
-                    "iniciales": iniciales_upper,
-                    "_id": {"$ne": ObjectId(usuario_id)}
-                })
-                if usuario_existente:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Las iniciales ya están en uso por otro usuario"
-                    )
-                update_data["iniciales"] = iniciales_upper
-
+                update_data["iniciales"] = datos.iniciales.upper()
             if datos.es_lider is not None:
                 update_data["es_lider"] = datos.es_lider
 
@@ -125,22 +162,27 @@ class AuthController:
 
             update_data["fecha_actualizacion"] = datetime.utcnow()
 
-            # Actualizar en la base de datos
-            result = await db[self.collection_name].update_one(
-                {"_id": ObjectId(usuario_id)},
-                {"$set": update_data}
-            )
+            # Actualizar y obtener el usuario actualizado en una sola operación;
+            # el índice único sobre "iniciales" evita duplicados
+            try:
+                usuario_actualizado = await self.get_collection().find_one_and_update(
+                    {"_id": ObjectId(usuario_id)},
+                    {"$set": update_data},
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Las iniciales ya están en uso por otro usuario"
+                )
 
-            if result.matched_count == 0:
+            if not usuario_actualizado:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Usuario no encontrado"
                 )
-
-            # Obtener usuario actualizado
-            usuario_actualizado = await db[self.collection_name].find_one(
-                {"_id": ObjectId(usuario_id)}
-            )
+            user_cache.put(usuario_actualizado)
+            await user_cache.bump_version()
 
             return usuario_actualizado
         
@@ -153,32 +195,43 @@ class AuthController:
             )
     async def cambiar_contrasena(self, usuario_id: str, datos: CambiarContrasena) -> bool:
         from bson import ObjectId
-        db = get_database()
+        collection = self.get_collection()
 
         try:
-            usuario = await db[self.collection_name].find_one({"_id": ObjectId(usuario_id)})
+            # Sin caché: otro nodo pudo cambiar el hash hace menos de USER_CACHE_VERSION_CHECK_SECONDS
+            usuario = await collection.find_one({"_id": ObjectId(usuario_id)}) if ObjectId.is_valid(usuario_id) else None
 
             if not usuario:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Usuario no encontrado"
                 )
-            if not self.verificar_contrasena(datos.contrasena_actual, usuario["contrasena_hash"]):
+            if not await self.verificar_contrasena(datos.contrasena_actual, usuario["contrasena_hash"]):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="La contraseña actual es incorrecta"
                 )
-            nueva_hash = self.hashear_contrasena(datos.contrasena_nueva)
-            result = await db[self.collection_name].update_one(
-                {"_id": ObjectId(usuario_id)},
+            nueva_hash = await self.hashear_contrasena(datos.contrasena_nueva)
+            # Condicionar al hash verificado evita pisar un cambio concurrente;
+            # incrementar token_version revoca los tokens emitidos antes del cambio
+            result = await collection.update_one(
+                {"_id": usuario["_id"], "contrasena_hash": usuario["contrasena_hash"]},
                 {
                     "$set": {
                         "contrasena_hash": nueva_hash,
                         "fecha_actualizacion": datetime.utcnow()
-                    }
+                    },
+                    "$inc": {"token_version": 1}
                 }
             )
-            return result.modified_count > 0
+            if result.modified_count == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="La contraseña se modificó durante la solicitud; intente nuevamente"
+                )
+            user_cache.remove(usuario_id)
+            await user_cache.bump_version()
+            return True
 
         except HTTPException:
             raise
@@ -2,7 +2,8 @@ from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
 from pymongo.collection import Collection
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from fastapi import HTTPException, status
 
 from models.employee_model import (
@@ -26,30 +27,30 @@ class EmployeeController:
         if self.collection is None:
             db = self.get_db()
             self.collection = db["employees"]
-            self.collection.create_index("codigo", unique=True)
-            self.collection.create_index([("nombre", "text"), ("codigo", "text")])
         return self.collection
 
+    async def ensure_indexes(self):
+        from database import create_index
+        collection = self.get_collection()
+        await create_index(collection, "codigo", unique=True)
+        await create_index(collection, [("nombre", "text"), ("codigo", "text")])
+
     async def create_employee(self, employee_data: EmployeeCreate) -> EmployeeResponse:
         try:
             collection = self.get_collection()
 
-            existing = await self.get_employee_by_codigo(employee_data.codigo)
-            if existing:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Ya existe un empleado con el código {employee_data.codigo}"
-                )
-
             employee_dict = employee_data.model_dump()
             employee_dict["created_at"] = datetime.utcnow()
-            employee_dict["updated_at"] = datetime.utcnow()
+            employee_dict["updated_at"] = employee_dict["created_at"]
 
-            result = await collection.insert_one(employee_dict)
-            
-            created_employee = await collection.find_one({"_id": result.inserted_id})
-            return self._format_employee(created_employee)
-            
+            await collection.insert_one(employee_dict)
+            return self._format_employee(employee_dict)
+
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Ya existe un empleado con el código {employee_data.codigo}"
+            )
         except HTTPException:
             raise
         except Exception as e:
@@ -148,19 +149,6 @@ class EmployeeController:
                 )
 
             collection = self.get_collection()
-            existing = await collection.find_one({"_id": ObjectId(employee_id)})
-            if not existing:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Empleado con ID {employee_id} no encontrado"
-                )
-            if employee_data.codigo and employee_data.codigo != existing.get("codigo"):
-                codigo_exists = await self.get_employee_by_codigo(employee_data.codigo)
-                if codigo_exists:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Ya existe un empleado con el código {employee_data.codigo}"
-                    )
             update_data = {
                 k: v for k, v in employee_data.model_dump(exclude_unset=True).items()
             }
@@ -172,13 +160,23 @@ class EmployeeController:
                 )
                 
             update_data["updated_at"] = datetime.utcnow()
-            await collection.update_one(
+            updated_employee = await collection.find_one_and_update(
                 {"_id": ObjectId(employee_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.AFTER
             )
-            updated_employee = await collection.find_one({"_id": ObjectId(employee_id)})
+            if not updated_employee:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Empleado con ID {employee_id} no encontrado"
+                )
             return self._format_employee(updated_employee)
             
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Ya existe un empleado con el código {employee_data.codigo}"
+            )
         except HTTPException:
             raise
         except Exception as e:
@@ -196,19 +194,12 @@ class EmployeeController:
                 )
 
             collection = self.get_collection()
-            employee = await collection.find_one({"_id": ObjectId(employee_id)})
+            employee = await collection.find_one_and_delete({"_id": ObjectId(employee_id)})
             if not employee:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Empleado con ID {employee_id} no encontrado"
                 )
-            result = await collection.delete_one({"_id": ObjectId(employee_id)})
-            
-            if result.deleted_count == 0:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="No se pudo eliminar el empleado"
-                )
 
             return {
                 "success": True,
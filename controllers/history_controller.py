@@ -21,9 +21,8 @@ class HistoryController:
         history_dict = data.model_dump(exclude_unset=True)
         history_dict["created_at"] = datetime.utcnow()
         result = await collection.insert_one(history_dict)
-        created = await collection.find_one({"_id": result.inserted_id})
-        created["_id"] = str(created["_id"])
-        return HistoryResponse(**created)
+        history_dict["_id"] = str(result.inserted_id)
+        return HistoryResponse(**history_dict)
 
     async def get_all_history(
         self,
@@ -75,6 +74,15 @@ class HistoryController:
             "historial": historial
         }
 
+    async def get_history_stamp(self, id: str) -> Optional[dict]:
+        """_id y fechas de la entrada, para la ETag, sin traer el documento completo"""
+        collection = self.get_collection()
+        try:
+            object_id = ObjectId(id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="ID de historial inválido")
+        return await collection.find_one({"_id": object_id}, {"created_at": 1, "updated_at": 1})
+
     async def get_history_by_id(self, id: str) -> HistoryResponse:
         collection = self.get_collection() 
         try:
@@ -123,13 +131,8 @@ class HistoryController:
         except Exception:
             raise HTTPException(status_code=400, detail="ID de historial inválido")
 
-        existing = await collection.find_one({"_id": object_id})
-        if not existing:
-            raise HTTPException(status_code=404, detail="Entrada de historial no encontrada")
-        
-        result = await collection.delete_one({"_id": object_id})
-        
-        if result.deleted_count == 0:
+        deleted = await collection.find_one_and_delete({"_id": object_id})
+        if not deleted:
             raise HTTPException(status_code=404, detail="Entrada de historial no encontrada")
         
         return {
@@ -1,62 +1,268 @@
 # controllers/processed_excel_controller.py
 
-from datetime import datetime
-from typing import Optional, List
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, List, Union
 from bson import ObjectId
 from fastapi import HTTPException
-from database import get_database
-from models.processed_products_model import ProcessedExcelModel, ProcessedExcelResponse
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+from config import settings
+from database import create_index, get_database
+from services.columnar_codec import DATA_FIELD, encode_document, decode_document
+from services.fast_json import trusted_dump
+from models.processed_products_model import (
+    ProcessedExcelColumnarModel,
+    ProcessedExcelCommit,
+    ProcessedExcelModel,
+    ProcessedExcelResponse,
+    ProcessedProductLine,
+    ProductoDetalle,
+)
 import pandas as pd
 from io import BytesIO
 
+logger = logging.getLogger(__name__)
+
+# Marca en la colección migrations de que processed_products está completo
+BACKFILL_MIGRATION_ID = "processed_products_backfill"
+
+# Campos de la cotización copiados en cada línea de processed_products
+LINE_HEADER_FIELDS = ["history_id", "num_deal", "num_oferta", "revision", "cliente", "created_at"]
+
+EXPORT_COLUMNS = {
+    "cliente": "Cliente",
+    "num_deal": "Num. Deal",
+    "num_oferta": "Num. Oferta",
+    "revision": "Revisión",
+    "created_at": "Fecha Procesamiento",
+    "num_item": "Num. Item",
+    "marca": "Marca",
+    "codigo_completo": "Código Completo",
+    "familia": "Familia",
+    "departamento": "Departamento",
+    "cantidad": "Cantidad",
+    "descuento_stf": "Descuento STF",
+    "descuento_cisac": "Descuento CISAC",
+    "margen": "Margen",
+    "fact_importacion": "Fact. De Importación",
+    "costo_importacion": "Costo de Importación",
+    "total_c_fijos": "Total C. Fijos",
+    "total_c_extras": "Total C. Extras",
+    "dias_fabricacion": "Días fabricación",
+    "peso_unva": "Peso (UNVA)",
+    "tiempo_unva": "Tiempo (UNVA)",
+    "moneda": "Moneda",
+    "precio_compra": "Precio Compra",
+    "precio_compra_2": "Precio Compra 2",
+    "precio_venta": "Precio venta",
+    "total": "Total"
+}
+
 class ProcessedExcelController:
     def __init__(self):
         self.db = None
         self.collection_name = "processed_excels"
+        self.products_collection_name = "processed_products"
+        self.staging_collection_name = "processed_excels_staging"
+        self._line_items_ready = False
     
     def get_collection(self):
         if self.db is None:
             self.db = get_database()
         return self.db[self.collection_name]
 
-    async def save_processed_excel(self, data: ProcessedExcelModel) -> ProcessedExcelResponse:
-        """Guardar Excel procesado en la base de datos"""
-        collection = self.get_collection()
-        
-        excel_dict = data.model_dump(exclude_unset=True)
+    async def ensure_indexes(self):
+        await create_index(self.get_collection(), "history_id")
+        products = self.get_products_collection()
+        await create_index(
+            products, [("processed_excel_id", ASCENDING), ("line_index", ASCENDING)], unique=True
+        )
+        await create_index(products, [("history_id", ASCENDING), ("line_index", ASCENDING)])
+        await create_index(products, [("created_at", DESCENDING)])
+        await create_index(products, [("num_deal", ASCENDING), ("created_at", DESCENDING)])
+        await create_index(products, [("codigo_completo", ASCENDING), ("created_at", DESCENDING)])
+        await create_index(products, [("departamento", ASCENDING), ("created_at", DESCENDING)])
+        await create_index(products, [("marca", ASCENDING), ("created_at", DESCENDING)])
+        # MongoDB borra los Excel en staging al llegar a expires_at
+        await create_index(self.get_staging_collection(), "expires_at", expireAfterSeconds=0)
+
+    def get_products_collection(self):
+        self.get_collection()
+        return self.db[self.products_collection_name]
+
+    def get_staging_collection(self):
+        self.get_collection()
+        return self.db[self.staging_collection_name]
+
+    @staticmethod
+    def _line_items(excel: dict) -> List[dict]:
+        """Una línea por producto con los datos de la cotización desnormalizados"""
+        header = {field: excel.get(field) for field in LINE_HEADER_FIELDS}
+        header["processed_excel_id"] = str(excel["_id"])
+        return [
+            {**producto, **header, "line_index": index}
+            for index, producto in enumerate(excel.get("productos", []))
+        ]
+
+    async def save_processed_excel(
+        self,
+        data: Union[ProcessedExcelModel, ProcessedExcelColumnarModel]
+    ) -> dict:
+        """Guardar Excel procesado; devuelve el documento con la forma de ProcessedExcelResponse"""
+        if isinstance(data, ProcessedExcelColumnarModel):
+            excel_dict = data.to_document()
+        else:
+            excel_dict = data.model_dump(exclude_unset=True)
+        # Los datos ya se validaron al recibir la petición
+        return await self._insert_excel(excel_dict)
+
+    async def _insert_excel(self, excel_dict: dict) -> dict:
         excel_dict["created_at"] = datetime.utcnow()
         
-        result = await collection.insert_one(excel_dict)
-        created = await collection.find_one({"_id": result.inserted_id})
-        created["_id"] = str(created["_id"])
+        stored = encode_document(excel_dict)
+        result = await self.get_collection().insert_one(stored)
+        excel_dict["_id"] = result.inserted_id
+        line_items = self._line_items(excel_dict)
+        if line_items:
+            try:
+                await self.get_products_collection().insert_many(line_items, ordered=False)
+            except Exception:
+                # Sin transacción: se deshace a mano para no dejar una cotización sin líneas
+                await self.get_products_collection().delete_many({"processed_excel_id": str(result.inserted_id)})
+                await self.get_collection().delete_one({"_id": result.inserted_id})
+                raise
+        excel_dict["_id"] = str(result.inserted_id)
         
-        return ProcessedExcelResponse(**created)
+        return trusted_dump(ProcessedExcelResponse, excel_dict)
+
+    async def stage_parsed_excel(self, parsed: dict, nombre_archivo: str) -> dict:
+        """Guardar el resultado del parseo hasta que llegue su history_id; devuelve el handle"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=settings.PARSE_HANDLE_TTL_MINUTES)
+        staged = {
+            "num_deal": parsed["num_deal"],
+            "num_oferta": parsed["num_oferta"],
+            "revision": parsed["revision"],
+            "cliente": parsed["cliente"],
+            "nombre_archivo": nombre_archivo,
+            "productos": parsed["productos"],
+            "total_productos": parsed["total_productos"],
+            "resumen_estadistico": parsed.get("resumen_estadistico"),
+        }
+        stored = encode_document(staged)
+        stored["staged_at"] = now
+        stored["expires_at"] = expires_at
+        result = await self.get_staging_collection().insert_one(stored)
+        return {"handle": str(result.inserted_id), "expires_at": expires_at}
+
+    async def commit_staged_excel(self, data: ProcessedExcelCommit) -> dict:
+        """Guardar como processed_excel un resultado en staging, sin reenviar los productos"""
+        try:
+            object_id = ObjectId(data.handle)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Handle inválido")
+
+        staging = self.get_staging_collection()
+        # find_one_and_delete reclama el handle: una segunda confirmación recibe 404
+        staged = await staging.find_one_and_delete(
+            {"_id": object_id, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        if not staged:
+            raise HTTPException(status_code=404, detail="Handle no encontrado o expirado")
+
+        excel_dict = decode_document({
+            key: value for key, value in staged.items()
+            if key not in ("_id", "staged_at", "expires_at")
+        })
+        excel_dict["history_id"] = data.history_id
+        if data.nombre_archivo:
+            excel_dict["nombre_archivo"] = data.nombre_archivo
+        try:
+            return await self._insert_excel(excel_dict)
+        except Exception:
+            # Devolver el handle para poder reintentar la confirmación
+            await staging.insert_one(staged)
+            raise
 
-    async def get_by_history_id(self, history_id: str) -> Optional[ProcessedExcelResponse]:
-        """Obtener Excel procesado por history_id"""
+    async def backfill_line_items(self, batch_size: int = 100) -> dict:
+        """Regenerar processed_products a partir de processed_excels (idempotente)"""
         collection = self.get_collection()
-        
-        excel = await collection.find_one({"history_id": history_id})
-        if not excel:
-            return None
-        
-        excel["_id"] = str(excel["_id"])
-        return ProcessedExcelResponse(**excel)
+        products = self.get_products_collection()
+        excels = 0
+        lines = 0
+        operations = []
 
-    async def export_to_excel(
-        self,
+        async for excel in collection.find({}, batch_size=batch_size):
+            excels += 1
+            for line in self._line_items(decode_document(excel)):
+                operations.append(ReplaceOne(
+                    {"processed_excel_id": line["processed_excel_id"], "line_index": line["line_index"]},
+                    line,
+                    upsert=True
+                ))
+            if len(operations) >= batch_size * 10:
+                await products.bulk_write(operations, ordered=False)
+                lines += len(operations)
+                operations = []
+
+        if operations:
+            await products.bulk_write(operations, ordered=False)
+            lines += len(operations)
+        await self.db["migrations"].update_one(
+            {"_id": BACKFILL_MIGRATION_ID},
+            {"$set": {"completed_at": datetime.utcnow(), "processed_excels": excels, "line_items": lines}},
+            upsert=True
+        )
+        self._line_items_ready = True
+        return {"processed_excels": excels, "line_items": lines}
+
+    async def _require_line_items(self):
+        """Las lecturas sobre processed_products omitirían las cotizaciones sin backfill"""
+        if self._line_items_ready:
+            return
+        self.get_collection()
+        if not await self.db["migrations"].find_one({"_id": BACKFILL_MIGRATION_ID}):
+            raise HTTPException(
+                status_code=503,
+                detail="Las líneas de producto aún no se han migrado; ejecute python -m scripts.backfill_processed_products"
+            )
+        self._line_items_ready = True
+
+    async def ensure_line_items(self, run_backfill: bool):
+        """Al iniciar: ejecutar el backfill pendiente o avisar que falta"""
+        self.get_collection()
+        if await self.db["migrations"].find_one({"_id": BACKFILL_MIGRATION_ID}):
+            self._line_items_ready = True
+            return
+        if not await self.get_collection().find_one({}, {"_id": 1}):
+            # Base nueva: todas las cotizaciones se guardarán con sus líneas
+            await self.backfill_line_items()
+            return
+        if not run_backfill:
+            logger.warning(
+                "processed_products no se ha rellenado desde processed_excels; búsquedas y exportaciones "
+                "de líneas responderán 503 hasta ejecutar python -m scripts.backfill_processed_products"
+            )
+            return
+        result = await self.backfill_line_items()
+        logger.info(
+            "Backfill de processed_products: %s cotizaciones, %s líneas",
+            result["processed_excels"], result["line_items"]
+        )
+
+    @staticmethod
+    def _line_query(
         fecha_inicio: Optional[str] = None,
         fecha_fin: Optional[str] = None,
         num_deal: Optional[str] = None,
         cliente: Optional[str] = None,
-        departamento: Optional[str] = None
-    ) -> BytesIO:
-        """Exportar datos filtrados a Excel"""
-        collection = self.get_collection()
-        
-        # Construir query de filtros
+        departamento: Optional[str] = None,
+        codigo_completo: Optional[str] = None,
+        marca: Optional[str] = None,
+        familia: Optional[str] = None,
+        history_id: Optional[str] = None
+    ) -> dict:
         query = {}
-        
         if fecha_inicio or fecha_fin:
             date_query = {}
             if fecha_inicio:
@@ -64,60 +270,139 @@ class ProcessedExcelController:
             if fecha_fin:
                 date_query["$lte"] = datetime.fromisoformat(fecha_fin)
             query["created_at"] = date_query
-        
         if num_deal:
             query["num_deal"] = num_deal
-        
         if cliente:
             query["cliente"] = {"$regex": cliente, "$options": "i"}
+        if departamento:
+            query["departamento"] = departamento
+        if codigo_completo:
+            query["codigo_completo"] = codigo_completo
+        if marca:
+            query["marca"] = marca
+        if familia:
+            query["familia"] = familia
+        if history_id:
+            query["history_id"] = history_id
+        return query
+
+    async def search_line_items(self, skip: int = 0, limit: int = 100, **filters) -> dict:
+        """Buscar líneas de producto entre todas las cotizaciones"""
+        await self._require_line_items()
+        products = self.get_products_collection()
+        query = self._line_query(**filters)
+        total = await products.count_documents(query)
+        cursor = products.find(query).sort(
+            [("created_at", DESCENDING), ("line_index", ASCENDING)]
+        ).skip(skip).limit(limit)
+        items = []
+        async for line in cursor:
+            line["_id"] = str(line["_id"])
+            items.append(ProcessedProductLine(**line))
+        return {"total": total, "skip": skip, "limit": limit, "data": items}
+
+    async def get_stamp_by_history_id(self, history_id: str) -> Optional[dict]:
+        """_id y fechas del Excel procesado, para la ETag, sin traer las líneas"""
+        return await self.get_collection().find_one(
+            {"history_id": history_id},
+            {"created_at": 1, "updated_at": 1}
+        )
+
+    async def get_by_history_id(self, history_id: str, include_productos: bool = True) -> Optional[dict]:
+        """Obtener Excel procesado por history_id, sin volver a validar lo guardado"""
+        collection = self.get_collection()
         
-        # Obtener datos
-        cursor = collection.find(query).sort("created_at", -1)
-        excels = await cursor.to_list(length=None)
+        # Sin productos solo viajan la cabecera y resumen_estadistico
+        projection = None if include_productos else {"productos": 0, DATA_FIELD: 0}
+        excel = await collection.find_one({"history_id": history_id}, projection)
+        if not excel:
+            return None
         
-        if not excels:
-            raise HTTPException(status_code=404, detail="No se encontraron datos para exportar")
+        decode_document(excel)
+        excel["_id"] = str(excel["_id"])
+        return trusted_dump(ProcessedExcelResponse, excel)
+
+    async def get_line_items(
+        self,
+        history_id: str,
+        skip: int = 0,
+        limit: int = 50,
+        sort_by: str = "line_index",
+        descending: bool = False,
+        departamento: Optional[str] = None,
+        marca: Optional[str] = None,
+        familia: Optional[str] = None
+    ) -> dict:
+        """Página de líneas de una cotización, servida por processed_products"""
+        if sort_by != "line_index" and sort_by not in ProductoDetalle.model_fields:
+            raise HTTPException(status_code=400, detail=f"No se puede ordenar por '{sort_by}'")
+        await self._require_line_items()
+
+        products = self.get_products_collection()
+        query = self._line_query(
+            history_id=history_id,
+            departamento=departamento,
+            marca=marca,
+            familia=familia
+        )
+        total = await products.count_documents(query)
+        if total == 0 and not await products.find_one({"history_id": history_id}, {"_id": 1}):
+            # Una cotización con productos pero sin líneas no debe verse como vacía
+            if await self.get_collection().find_one(
+                {"history_id": history_id, "total_productos": {"$gt": 0}}, {"_id": 1}
+            ):
+                raise HTTPException(
+                    status_code=409,
+                    detail="La cotización no tiene líneas en processed_products; ejecute python -m scripts.backfill_processed_products"
+                )
+        direction = DESCENDING if descending else ASCENDING
+        sort = [(sort_by, direction)]
+        if sort_by != "line_index":
+            sort.append(("line_index", ASCENDING))
+        cursor = products.find(query).sort(sort).skip(skip).limit(limit)
+        items = []
+        async for line in cursor:
+            line["_id"] = str(line["_id"])
+            items.append(trusted_dump(ProcessedProductLine, line))
+        return {"total": total, "skip": skip, "limit": limit, "data": items}
+
+    async def export_to_excel(
+        self,
+        fecha_inicio: Optional[str] = None,
+        fecha_fin: Optional[str] = None,
+        num_deal: Optional[str] = None,
+        cliente: Optional[str] = None,
+        departamento: Optional[str] = None,
+        codigo_completo: Optional[str] = None,
+        marca: Optional[str] = None
+    ) -> BytesIO:
+        """Exportar datos filtrados a Excel"""
+        await self._require_line_items()
+        products = self.get_products_collection()
+        query = self._line_query(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            num_deal=num_deal,
+            cliente=cliente,
+            departamento=departamento,
+            codigo_completo=codigo_completo,
+            marca=marca
+        )
+        projection = {field: 1 for field in EXPORT_COLUMNS}
+        projection.update({"_id": 0, "processed_excel_id": 1})
+        cursor = products.find(query, projection).sort(
+            [("created_at", DESCENDING), ("line_index", ASCENDING)]
+        )
+        lines = await cursor.to_list(length=None)
         
-        # Consolidar todos los productos
-        all_products = []
-        for excel in excels:
-            for producto in excel.get("productos", []):
-                # Filtrar por departamento si se especifica
-                if departamento and producto.get("departamento") != departamento:
-                    continue
-                
-                product_row = {
-                    "Cliente": excel.get("cliente"),
-                    "Num. Deal": excel.get("num_deal"),
-                    "Num. Oferta": excel.get("num_oferta"),
-                    "Revisión": excel.get("revision"),
-                    "Fecha Procesamiento": excel.get("created_at").strftime("%Y-%m-%d %H:%M:%S") if excel.get("created_at") else "",
-                    "Num. Item": producto.get("num_item"),
-                    "Marca": producto.get("marca"),
-                    "Código Completo": producto.get("codigo_completo"),
-                    "Familia": producto.get("familia"),
-                    "Departamento": producto.get("departamento"),
-                    "Cantidad": producto.get("cantidad"),
-                    "Descuento STF": producto.get("descuento_stf"),
-                    "Descuento CISAC": producto.get("descuento_cisac"),
-                    "Margen": producto.get("margen"),
-                    "Fact. De Importación": producto.get("fact_importacion"),
-                    "Costo de Importación": producto.get("costo_importacion"),
-                    "Total C. Fijos": producto.get("total_c_fijos"),
-                    "Total C. Extras": producto.get("total_c_extras"),
-                    "Días fabricación": producto.get("dias_fabricacion"),
-                    "Peso (UNVA)": producto.get("peso_unva"),
-                    "Tiempo (UNVA)": producto.get("tiempo_unva"),
-                    "Moneda": producto.get("moneda"),
-                    "Precio Compra": producto.get("precio_compra"),
-                    "Precio Compra 2": producto.get("precio_compra_2"),
-                    "Precio venta": producto.get("precio_venta"),
-                    "Total": producto.get("total")
-                }
-                all_products.append(product_row)
+        if not lines:
+            raise HTTPException(status_code=404, detail="No se encontraron datos para exportar")
         
-        # Crear DataFrame
-        df = pd.DataFrame(all_products)
+        df = pd.DataFrame(lines)
+        total_archivos = df["processed_excel_id"].nunique()
+        df = df.reindex(columns=list(EXPORT_COLUMNS))
+        df["created_at"] = pd.to_datetime(df["created_at"]).dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
+        df = df.rename(columns=EXPORT_COLUMNS)
         
         # Crear archivo Excel en memoria
         output = BytesIO()
@@ -134,11 +419,11 @@ class ProcessedExcelController:
                     "Clientes Únicos"
                 ],
                 "Valor": [
-                    len(all_products),
-                    len(excels),
+                    len(df),
+                    total_archivos,
                     f"{fecha_inicio or 'N/A'} - {fecha_fin or 'N/A'}",
-                    len(set(p["Num. Deal"] for p in all_products)),
-                    len(set(p["Cliente"] for p in all_products))
+                    df["Num. Deal"].nunique(dropna=False),
+                    df["Cliente"].nunique(dropna=False)
                 ]
             }
             df_summary = pd.DataFrame(summary_data)
@@ -153,32 +438,37 @@ class ProcessedExcelController:
         fecha_fin: Optional[str] = None
     ) -> dict:
         """Obtener estadísticas para preview antes de exportar"""
+        await self._require_line_items()
         collection = self.get_collection()
-        
-        query = {}
-        if fecha_inicio or fecha_fin:
-            date_query = {}
-            if fecha_inicio:
-                date_query["$gte"] = datetime.fromisoformat(fecha_inicio)
-            if fecha_fin:
-                date_query["$lte"] = datetime.fromisoformat(fecha_fin)
-            query["created_at"] = date_query
+        query = self._line_query(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
         
         total_archivos = await collection.count_documents(query)
         
-        cursor = collection.find(query)
-        excels = await cursor.to_list(length=None)
+        # Conteos por línea resueltos en el servidor sobre processed_products
+        pipeline = [
+            {"$match": query},
+            {"$facet": {
+                "productos": [{"$count": "total"}],
+                "deals": [{"$group": {"_id": "$num_deal"}}, {"$count": "total"}],
+                "clientes": [{"$group": {"_id": "$cliente"}}, {"$count": "total"}],
+                "departamentos": [
+                    {"$group": {
+                        "_id": {"$ifNull": ["$departamento", "Sin departamento"]},
+                        "count": {"$sum": 1}
+                    }}
+                ]
+            }}
+        ]
+        cursor = self.get_products_collection().aggregate(pipeline)
+        facets = (await cursor.to_list(length=1))[0]
         
-        total_productos = sum(excel.get("total_productos", 0) for excel in excels)
-        deals_unicos = len(set(excel.get("num_deal") for excel in excels))
-        clientes_unicos = len(set(excel.get("cliente") for excel in excels))
+        def facet_total(name: str) -> int:
+            return facets[name][0]["total"] if facets[name] else 0
         
-        # Productos por departamento
-        dept_count = {}
-        for excel in excels:
-            for producto in excel.get("productos", []):
-                dept = producto.get("departamento", "Sin departamento")
-                dept_count[dept] = dept_count.get(dept, 0) + 1
+        total_productos = facet_total("productos")
+        deals_unicos = facet_total("deals")
+        clientes_unicos = facet_total("clientes")
+        dept_count = {item["_id"]: item["count"] for item in facets["departamentos"]}
         
         return {
             "total_archivos": total_archivos,
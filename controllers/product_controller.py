@@ -2,8 +2,20 @@ from datetime import datetime
 from typing import List, Optional
 from bson import ObjectId
 from fastapi import HTTPException
-from database import get_database
-from models.product_model import ProductModel, ProductUpdate, ProductResponse
+from fastapi.concurrency import run_in_threadpool
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from database import create_index, get_database
+from models.product_model import (
+    ProductModel,
+    ProductUpdate,
+    ProductResponse,
+    ProductResolveRequest,
+    ProductResolveResponse,
+)
+from services.catalog_import import CATALOG_FIELDS, build_upsert, read_catalog_file, validate_catalog
+from services.columnar_codec import DATA_FIELD, ENCODING_FIELD, decode_document
+from services.product_catalog import product_catalog
 
 class ProductController:
     def __init__(self):
@@ -15,6 +27,15 @@ class ProductController:
             self.db = get_database()
         return self.db[self.collection_name]
 
+    async def ensure_indexes(self):
+        collection = self.get_collection()
+        await create_index(collection, "code", unique=True)
+        await create_index(collection, [("updated_at", -1)])
+
+    async def get_catalog_version(self) -> tuple:
+        """(cantidad, última modificación) del catálogo; cambia con cada alta, edición o baja"""
+        return await product_catalog.read_fingerprint()
+
     async def get_all_products(
         self,
         skip: int = 0,
@@ -61,36 +82,70 @@ class ProductController:
         return ProductResponse(**producto)
 
     async def get_product_by_code(self, code: str) -> Optional[ProductResponse]:
-        collection = self.get_collection() 
-        producto = await collection.find_one({"code": code})
-        if not producto:
-            return None
-        producto["_id"] = str(producto["_id"])
-        return ProductResponse(**producto)
+        return await product_catalog.get_by_code(code)
 
-    async def create_product(self, data: ProductModel) -> ProductResponse:
-        collection = self.get_collection()
+    async def get_products_by_unidad_negocio(
+        self,
+        unidad_negocio: str,
+        area: Optional[int] = None
+    ) -> List[ProductResponse]:
+        return await product_catalog.get_by_unidad_negocio(unidad_negocio, area=area)
 
-        # Verificar si ya existe un producto con ese código
-        existing = await collection.find_one({"code": data.code})
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Ya existe un producto con el código {data.code}"
+    async def resolve_codes(self, data: ProductResolveRequest) -> ProductResolveResponse:
+        """Resolver en una sola llamada todos los códigos de una cotización"""
+        codes = list(data.codes)
+
+        if data.processed_excel_id:
+            try:
+                object_id = ObjectId(data.processed_excel_id)
+            except Exception:
+                raise HTTPException(status_code=400, detail="ID de Excel procesado inválido")
+            excel = await get_database()["processed_excels"].find_one(
+                {"_id": object_id},
+                {"productos.codigo_completo": 1, ENCODING_FIELD: 1, DATA_FIELD: 1}
+            )
+            if not excel:
+                raise HTTPException(status_code=404, detail="Excel procesado no encontrado")
+            decode_document(excel)
+            codes.extend(
+                producto["codigo_completo"]
+                for producto in excel.get("productos", [])
+                if producto.get("codigo_completo")
             )
 
+        # Quitar duplicados conservando el orden de la cotización
+        unique_codes = list(dict.fromkeys(str(code).strip() for code in codes if str(code).strip()))
+        productos, missing = await product_catalog.get_many(unique_codes)
+
+        return ProductResolveResponse(
+            productos=productos,
+            missing=missing,
+            total_codes=len(unique_codes)
+        )
+
+    def get_catalog_stats(self) -> dict:
+        return product_catalog.stats()
+
+    async def create_product(self, data: ProductModel) -> ProductResponse:
+        collection = self.get_collection()
+
         # Preparar datos para inserción
         product_dict = data.model_dump()  # Sin by_alias ni exclude
         product_dict["created_at"] = datetime.utcnow()
-        product_dict["updated_at"] = datetime.utcnow()
+        product_dict["updated_at"] = product_dict["created_at"]
 
-        # Insertar en la base de datos
-        result = await collection.insert_one(product_dict)
+        # El índice único sobre "code" reemplaza la verificación previa
+        try:
+            result = await collection.insert_one(product_dict)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ya existe un producto con el código {data.code}"
+            )
+        product_catalog.invalidate()
 
-        # Recuperar el documento creado
-        created = await collection.find_one({"_id": result.inserted_id})
-        created["_id"] = str(created["_id"])
-        return ProductResponse(**created)
+        product_dict["_id"] = str(result.inserted_id)
+        return ProductResponse(**product_dict)
 
     async def update_product(self, id: str, data: ProductUpdate) -> ProductResponse:
         collection = self.get_collection()
@@ -100,41 +155,28 @@ class ProductController:
         except Exception:
             raise HTTPException(status_code=400, detail="ID de producto inválido")
 
-        # Verificar que el producto existe
-        existing = await collection.find_one({"_id": object_id})
-        if not existing:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-        
         # Preparar datos de actualización
         update_data = data.model_dump(exclude_unset=True, exclude_none=True)
-        
-        # Si se está actualizando el código, verificar que no exista
-        if "code" in update_data and update_data["code"] != existing.get("code"):
-            code_exists = await collection.find_one({
-                "code": update_data["code"],
-                "_id": {"$ne": object_id}
-            })
-            if code_exists:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Ya existe otro producto con el código {update_data['code']}"
-                )
-        
         update_data["updated_at"] = datetime.utcnow()
         
-        # Actualizar
-        result = await collection.update_one(
-            {"_id": object_id},
-            {"$set": update_data}
-        )
+        # Actualizar y recuperar el documento en una sola operación
+        try:
+            updated = await collection.find_one_and_update(
+                {"_id": object_id},
+                {"$set": update_data},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ya existe otro producto con el código {update_data['code']}"
+            )
 
-        if result.matched_count == 0:
+        if not updated:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
+        product_catalog.invalidate()
 
-        # Recuperar documento actualizado
-        updated = await collection.find_one({"_id": object_id})
         updated["_id"] = str(updated["_id"])
-
         return ProductResponse(**updated)
 
     async def delete_product(self, id: str) -> dict:
@@ -145,14 +187,10 @@ class ProductController:
         except Exception:
             raise HTTPException(status_code=400, detail="ID de producto inválido")
 
-        existing = await collection.find_one({"_id": object_id})
-        if not existing:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-        
-        result = await collection.delete_one({"_id": object_id})
-        
-        if result.deleted_count == 0:
+        deleted = await collection.find_one_and_delete({"_id": object_id})
+        if not deleted:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
+        product_catalog.invalidate()
         
         return {
             "success": True,
@@ -160,5 +198,74 @@ class ProductController:
             "deleted_id": id
         }
 
+    async def import_products(self, content: bytes, filename: str, ordered: bool = False) -> dict:
+        """Importar el catálogo completo con un único bulk_write de upserts por código"""
+        collection = self.get_collection()
+
+        try:
+            # pandas bloquea: fuera del event loop
+            rows, rejected = await run_in_threadpool(
+                lambda: validate_catalog(read_catalog_file(content, filename))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"No se pudo leer el archivo: {str(e)}")
+
+        codes = [row["data"]["code"] for row in rows]
+        existing = {}
+        cursor = collection.find({"code": {"$in": codes}}, {field: 1 for field in CATALOG_FIELDS})
+        async for doc in cursor:
+            existing[doc["code"]] = doc
+
+        now = datetime.utcnow()
+        operations = []
+        pending = []
+        results = []
+        for row in rows:
+            data = row["data"]
+            current = existing.get(data["code"])
+            if current is None:
+                row_status = "inserted"
+            elif all(current.get(field) == value for field, value in data.items()):
+                results.append({"row": row["row"], "code": data["code"], "status": "unchanged"})
+                continue
+            else:
+                row_status = "updated"
+
+            operations.append(build_upsert(data, now))
+            pending.append({"row": row["row"], "code": data["code"], "status": row_status})
+
+        if operations:
+            try:
+                await collection.bulk_write(operations, ordered=ordered)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                failed = {error["index"]: error.get("errmsg", "Error de escritura") for error in write_errors}
+                # En modo ordenado las operaciones posteriores al primer error no se aplican
+                first_failed = min(failed) if ordered and failed else None
+                for index, item in enumerate(pending):
+                    if index in failed:
+                        item.update(status="rejected", error=failed[index])
+                    elif first_failed is not None and index > first_failed:
+                        item.update(status="rejected", error="No aplicado por un error previo")
+            finally:
+                product_catalog.invalidate()
+
+        results.extend(pending)
+        results.extend(rejected)
+        results.sort(key=lambda item: item["row"])
+
+        summary = {key: 0 for key in ("inserted", "updated", "unchanged", "rejected")}
+        for item in results:
+            summary[item["status"]] += 1
+
+        return {
+            "success": True,
+            "total_rows": len(results),
+            **summary,
+            "rows": results
+        }
+
 
 product_controller = ProductController()
\ No newline at end of file
@@ -1,13 +1,23 @@
+import hashlib
+import logging
 import os
 import shutil
-from datetime import datetime
-from typing import List
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
 from fastapi import UploadFile, HTTPException
 from config import settings
-from database import get_database
-from models.report_model import ReportModel, ErrorDetail
-from services.excel_processor import excel_processor
-from services.cloud_storage import cloud_storage
+from database import create_index, get_database
+from models.report_model import ReportModel, ErrorDetail, InputFileDetail
+from services.excel_processor import excel_processor, PARSER_VERSION
+from services.profiling import StageTimer
+from services.report_fragments import load_fragments, save_fragments
+from services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 class ReportController:
     def __init__(self):
@@ -18,25 +28,231 @@ class ReportController:
             self.db = get_database()
         return self.db
 
-    async def generate_report(self, files: List[UploadFile]) -> dict:
-        temp_paths = []       
+    async def ensure_indexes(self):
+        await create_index(self.get_db().reports, [("input_set_hash", 1), ("created_at", -1)])
+
+    @staticmethod
+    def _hash_upload(file: UploadFile) -> str:
+        sha256 = hashlib.sha256()
+        for chunk in iter(lambda: file.file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+        file.file.seek(0)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def _input_set_hash(file_hashes: List[str]) -> str:
+        return hashlib.sha256("\n".join(sorted(file_hashes)).encode("utf-8")).hexdigest()
+
+    async def _find_duplicate(self, input_set_hash: str) -> Optional[dict]:
+        """Reporte reciente y exitoso generado a partir de los mismos archivos"""
+        since = datetime.utcnow() - timedelta(hours=settings.REPORT_DEDUP_WINDOW_HOURS)
+        return await self.get_db().reports.find_one(
+            {
+                "input_set_hash": input_set_hash,
+                "parser_version": PARSER_VERSION,
+                "status": {"$in": ["success", "partial"]},
+                "created_at": {"$gte": since}
+            },
+            sort=[("created_at", -1)]
+        )
+
+    @staticmethod
+    def _report_response(report: dict, deduplicated: bool = False) -> dict:
+        return {
+            "success": True,
+            "deduplicated": deduplicated,
+            "report_id": str(report["_id"]),
+            "filename": report["filename"],
+            "processed_files": report["files_processed"],
+            "files_with_errors": report["files_with_errors"],
+            "total_records": report["total_records"],
+            "errors": report.get("errors", []),
+            "download_url": report.get("download_url"),
+            "processing_time": report["processing_time"],
+            "timings": report.get("timings"),
+            "timestamp": report["updated_at"].isoformat()
+        }
+
+    @staticmethod
+    def _save_uploads(files: List[UploadFile], input_files: List[InputFileDetail], upload_dir: str) -> Dict[str, str]:
+        """Guardar cada archivo en `upload_dir/<sha256>/<nombre>`; devuelve hash -> ruta.
+
+        El directorio es propio de la petición y la subcarpeta por hash conserva
+        el nombre original sin que dos archivos homónimos se pisen.
+        """
+        uploads = {}
+        for file, input_file in zip(files, input_files):
+            if input_file.sha256 in uploads:
+                continue
+            file_dir = os.path.join(upload_dir, input_file.sha256)
+            os.makedirs(file_dir)
+            temp_path = os.path.join(file_dir, os.path.basename(file.filename))
+            with open(temp_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+            uploads[input_file.sha256] = temp_path
+        return uploads
+
+    @staticmethod
+    def _upload_dir() -> str:
+        return tempfile.mkdtemp(prefix="upload_", dir=settings.TEMP_FOLDER)
+
+    async def _upload_output(self, report_id: ObjectId, dataframe, timer: StageTimer) -> tuple:
+        """Escribir el consolidado y subirlo; devuelve (nombre, clave, tamaño en MB)"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_filename = f"resultado_final_{timestamp}.xlsx"
+        # El id evita que dos reportes del mismo segundo compartan (y borren) el archivo
+        storage_key = f"reports/{report_id}/{output_filename}"
+        # El XLSX se escribe en memoria (o en un temporal anónimo si es muy grande)
+        # y se sube directamente, sin pasar por TEMP_FOLDER
+        with tempfile.SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_MAX_MB * 1024 * 1024) as output:
+            with timer.stage("xlsx_write"):
+                dataframe.to_excel(output, index=False, engine='openpyxl')
+            file_size_mb = output.tell() / (1024 * 1024)
+            output.seek(0)
+            with timer.stage("upload", cpu=False):
+                await get_storage().put_stream(storage_key, output, content_type=XLSX_CONTENT_TYPE)
+        return output_filename, storage_key, file_size_mb
+
+    async def _store_fragments(self, input_files: List[InputFileDetail], uploads: Dict[str, str], frames: dict):
+        """Guardar el resultado de cada archivo para poder ampliar el reporte después"""
+        parsed = {
+            file_hash: frames[temp_path]
+            for file_hash, temp_path in uploads.items()
+            if temp_path in frames
+        }
+        try:
+            keys = await save_fragments(get_storage(), parsed)
+        except Exception as e:
+            logger.warning("No se pudieron guardar los fragmentos del reporte: %s", e)
+            return
+        for input_file in input_files:
+            input_file.fragment_key = keys.get(input_file.sha256, input_file.fragment_key)
+
+    async def _release_fragments(self, keys: List[str]):
+        """Borrar los fragmentos que ya no referencia ningún reporte"""
+        db = self.get_db()
+        storage = get_storage()
+        for key in set(keys):
+            if await db.reports.count_documents({"input_files.fragment_key": key}, limit=1):
+                continue
+            try:
+                await storage.delete(key)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning("No se pudo borrar el fragmento %s: %s", key, e)
+
+    async def prune_fragments(self, older_than_days: int) -> dict:
+        """Quitar los fragmentos de reportes sin cambios en `older_than_days` días.
+
+        Esos reportes dejan de admitir ampliación (responden 409 y se regeneran).
+        """
+        db = self.get_db()
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        query = {"updated_at": {"$lt": cutoff}, "input_files.fragment_key": {"$ne": None}}
+        keys = []
+        reports = 0
+        async for report in db.reports.find(query, {"input_files": 1, "updated_at": 1}):
+            input_files = report["input_files"]
+            released = [f["fragment_key"] for f in input_files if f.get("fragment_key")]
+            # El filtro por updated_at evita pisar un reporte ampliado mientras tanto
+            result = await db.reports.update_one(
+                {"_id": report["_id"], "updated_at": report["updated_at"]},
+                {"$set": {"input_files": [{**f, "fragment_key": None} for f in input_files]}}
+            )
+            if result.modified_count:
+                keys.extend(released)
+                reports += 1
+        await self._release_fragments(keys)
+        return {"reports": reports, "fragments": len(set(keys))}
+
+    @staticmethod
+    def _profile_options(report_id: ObjectId, profile: bool) -> tuple:
+        """(umbral, carpeta) para los volcados de cProfile; `profile` fuerza uno por archivo"""
+        threshold = 0.0 if profile else settings.PARSE_PROFILE_THRESHOLD_SECONDS
+        if threshold is None:
+            return None, None
+        return threshold, os.path.join(settings.TEMP_FOLDER, "profiles", str(report_id))
+
+    async def _store_profiles(self, report_id: ObjectId, file_timings: List[dict]):
+        """Subir los volcados de cProfile y reemplazar la ruta local por su clave"""
+        for timings in file_timings:
+            profile_path = timings.pop("profile_path", None)
+            if not profile_path:
+                continue
+            profile_key = f"profiles/{report_id}/{os.path.basename(profile_path)}"
+            try:
+                await get_storage().put_file(profile_key, profile_path, content_type="application/octet-stream")
+                timings["profile_key"] = profile_key
+            except Exception as e:
+                logger.warning("No se pudo guardar el perfil %s: %s", profile_key, e)
+            finally:
+                os.remove(profile_path)
+
+    async def _run_report(
+        self,
+        report_id: ObjectId,
+        temp_paths: List[str],
+        timer: StageTimer,
+        profile: bool,
+        base_frames: Optional[list] = None
+    ) -> tuple:
+        """Procesar, escribir y subir el consolidado; devuelve (resultado, nombre, clave, tamaño en MB)"""
+        profile_threshold, profile_dir = self._profile_options(report_id, profile)
+        result = excel_processor.process_multiple_files(
+            temp_paths,
+            base_frames=base_frames,
+            profile_threshold=profile_threshold,
+            profile_dir=profile_dir,
+            timer=timer
+        )
+        await self._store_profiles(report_id, result["file_timings"])
+        if profile_dir:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result.get("error", "Error al procesar archivos"))
+        output_filename, storage_key, file_size_mb = await self._upload_output(report_id, result["dataframe"], timer)
+        return result, output_filename, storage_key, file_size_mb
+
+    @staticmethod
+    def _timings(timer: StageTimer, result: dict) -> dict:
+        return {**timer.as_dict(), "files": result["file_timings"]}
+
+    async def generate_report(
+        self,
+        files: List[UploadFile],
+        force: bool = False,
+        profile: bool = False,
+        base_url: str = ""
+    ) -> dict:
+        """`base_url` (la de la petición) arma la URL absoluta de descarga si no hay PUBLIC_BASE_URL"""
+        upload_dir = None
+        timer = StageTimer()
         try:
-            for file in files:
-                temp_path = os.path.join(settings.TEMP_FOLDER, file.filename)
-                with open(temp_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                temp_paths.append(temp_path)
-            result = excel_processor.process_multiple_files(temp_paths)
-            if not result["success"]:
-                raise HTTPException(status_code=400, detail=result.get("error", "Error al procesar archivos"))
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"resultado_final_{timestamp}.xlsx"
-            output_path = os.path.join(settings.TEMP_FOLDER, output_filename)
-            result["dataframe"].to_excel(output_path, index=False, engine='openpyxl')
-            file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
-            firebase_url = await cloud_storage.upload_file(output_path, output_filename)
-            if os.path.exists(output_path):
-                os.remove(output_path)
+            with timer.stage("hash_inputs"):
+                input_files = [
+                    InputFileDetail(filename=file.filename, sha256=self._hash_upload(file))
+                    for file in files
+                ]
+            input_set_hash = self._input_set_hash([f.sha256 for f in input_files])
+            if not force:
+                with timer.stage("dedup_check", cpu=False):
+                    duplicate = await self._find_duplicate(input_set_hash)
+                if duplicate:
+                    return self._report_response(duplicate, deduplicated=True)
+
+            report_id = ObjectId()
+            upload_dir = self._upload_dir()
+            with timer.stage("save_uploads"):
+                uploads = self._save_uploads(files, input_files, upload_dir)
+            result, output_filename, storage_key, file_size_mb = await self._run_report(
+                report_id, list(uploads.values()), timer, profile
+            )
+            with timer.stage("fragments", cpu=False):
+                await self._store_fragments(input_files, uploads, result["frames"])
+            # El frontend se sirve desde otro origen: una URL relativa apuntaría a él
+            public_base_url = (settings.PUBLIC_BASE_URL or base_url).rstrip("/")
+            download_url = f"{public_base_url}/api/reports/{report_id}/download"
             report_data = ReportModel(
                 filename=output_filename,
                 files_processed=result["processed_files"],
@@ -44,34 +260,24 @@ class ReportController:
                 total_records=result["total_records"],
                 status="success" if result["files_with_errors"] == 0 else "partial",
                 file_size=round(file_size_mb, 2),
-                file_url=firebase_url,
-                download_url=firebase_url,
+                file_url=download_url,
+                download_url=download_url,
                 processing_time=result["processing_time"],
-                errors=[ErrorDetail(**error) for error in result["errors"]]
+                errors=[ErrorDetail(**error) for error in result["errors"]],
+                storage_key=storage_key,
+                input_files=input_files,
+                input_set_hash=input_set_hash,
+                parser_version=PARSER_VERSION,
+                timings=self._timings(timer, result)
             )
             db = self.get_db()
-            inserted = await db.reports.insert_one(report_data.model_dump(by_alias=True, exclude={'id'}))
-            report_data.id = inserted.inserted_id
-            for temp_path in temp_paths:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)            
-            return {
-                "success": True,
-                "report_id": str(report_data.id),
-                "filename": output_filename,
-                "processed_files": result["processed_files"],
-                "files_with_errors": result["files_with_errors"],
-                "total_records": result["total_records"],
-                "errors": result["errors"],
-                "download_url": firebase_url,
-                "processing_time": result["processing_time"],
-                "timestamp": datetime.now().isoformat()
-            }
+            report_doc = report_data.model_dump(by_alias=True, exclude={'id'})
+            report_doc["_id"] = report_id
+            # Los tiempos viajan en el mismo documento; la inserción no se mide
+            await db.reports.insert_one(report_doc)
+            return self._report_response(report_doc)
 
         except Exception as e:
-            for temp_path in temp_paths:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
             error_report = ReportModel(
                 filename="error_report",
                 files_processed=0,
@@ -85,6 +291,95 @@ class ReportController:
             db = self.get_db()
             await db.reports.insert_one(error_report.model_dump(by_alias=True, exclude={'id'}))
             raise HTTPException(status_code=500, detail=f"Error al procesar archivos: {str(e)}")
+        finally:
+            if upload_dir:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+
+    async def append_to_report(self, report_id: str, files: List[UploadFile], profile: bool = False) -> dict:
+        """Ampliar un reporte procesando solo los archivos nuevos"""
+        db = self.get_db()
+        try:
+            object_id = ObjectId(report_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="ID de reporte inválido")
+
+        report = await db.reports.find_one({"_id": object_id})
+        if not report:
+            raise HTTPException(status_code=404, detail="Reporte no encontrado")
+
+        input_files = [InputFileDetail(**f) for f in report.get("input_files", [])]
+        parsed_files = [f for f in input_files if f.fragment_key]
+        if report.get("status") == "error" or not parsed_files or report.get("parser_version") != PARSER_VERSION:
+            raise HTTPException(
+                status_code=409,
+                detail="El reporte no admite ampliación; genérelo nuevamente con todos los archivos"
+            )
+
+        known_hashes = {f.sha256 for f in input_files}
+        new_files = []
+        new_inputs = []
+        for file in files:
+            file_hash = self._hash_upload(file)
+            if file_hash in known_hashes:
+                continue
+            known_hashes.add(file_hash)
+            new_files.append(file)
+            new_inputs.append(InputFileDetail(filename=file.filename, sha256=file_hash))
+        if not new_files:
+            raise HTTPException(status_code=400, detail="Todos los archivos ya forman parte del reporte")
+
+        storage = get_storage()
+        fragments = await load_fragments(storage, [f.fragment_key for f in parsed_files])
+        if any(fragment is None for fragment in fragments):
+            raise HTTPException(
+                status_code=409,
+                detail="Faltan fragmentos del reporte; genérelo nuevamente con todos los archivos"
+            )
+
+        upload_dir = self._upload_dir()
+        timer = StageTimer()
+        try:
+            with timer.stage("save_uploads"):
+                uploads = self._save_uploads(new_files, new_inputs, upload_dir)
+            result, output_filename, storage_key, file_size_mb = await self._run_report(
+                object_id, list(uploads.values()), timer, profile, base_frames=fragments
+            )
+            with timer.stage("fragments", cpu=False):
+                await self._store_fragments(new_inputs, uploads, result["frames"])
+        finally:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+        all_inputs = input_files + new_inputs
+        files_with_errors = report["files_with_errors"] + result["files_with_errors"]
+        update = {
+            "filename": output_filename,
+            "storage_key": storage_key,
+            "file_size": round(file_size_mb, 2),
+            "files_processed": report["files_processed"] + result["processed_files"],
+            "files_with_errors": files_with_errors,
+            "total_records": result["total_records"],
+            "status": "success" if files_with_errors == 0 else "partial",
+            "processing_time": result["processing_time"],
+            "errors": report.get("errors", []) + result["errors"],
+            "input_files": [f.model_dump() for f in all_inputs],
+            "input_set_hash": self._input_set_hash([f.sha256 for f in all_inputs]),
+            "timings": self._timings(timer, result),
+            "updated_at": datetime.utcnow()
+        }
+        await db.reports.update_one({"_id": object_id}, {"$set": update})
+
+        old_key = report.get("storage_key") or f"reports/{report['filename']}"
+        storage.forget_download_url(old_key)
+        if old_key != storage_key:
+            try:
+                await storage.delete(old_key)
+            except Exception:
+                pass
+
+        return {
+            **self._report_response({**report, **update}),
+            "appended_files": len(new_files)
+        }
 
     async def get_reports_history(self, limit: int = 50, skip: int = 0):
         db = self.get_db()
@@ -114,21 +409,47 @@ class ReportController:
         from bson import ObjectId
         db = self.get_db()
         try:
-            report = await db.reports.find_one({"_id": ObjectId(report_id)})
+            report = await db.reports.find_one_and_delete({"_id": ObjectId(report_id)})
             if not report:
                 raise HTTPException(status_code=404, detail="Reporte no encontrado")
             if report.get("filename"):
+                storage_key = report.get("storage_key") or f"reports/{report['filename']}"
+                get_storage().forget_download_url(storage_key)
                 try:
-                    await cloud_storage.delete_file(f"reports/{report['filename']}")
+                    await get_storage().delete(storage_key)
                 except:
                     pass
-
-            await db.reports.delete_one({"_id": ObjectId(report_id)})
+            await self._release_fragments([
+                f["fragment_key"] for f in report.get("input_files", []) if f.get("fragment_key")
+            ])
             
             return {"success": True, "message": "Reporte eliminado"}
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al eliminar reporte: {str(e)}")
 
+    async def get_download_url(self, report_id: str) -> str:
+        """URL firmada y temporal del archivo de un reporte"""
+        db = self.get_db()
+        try:
+            object_id = ObjectId(report_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="ID de reporte inválido")
+
+        report = await db.reports.find_one(
+            {"_id": object_id},
+            {"filename": 1, "storage_key": 1, "status": 1}
+        )
+        if not report:
+            raise HTTPException(status_code=404, detail="Reporte no encontrado")
+        if report.get("status") == "error":
+            raise HTTPException(status_code=404, detail="El reporte no tiene archivo generado")
+
+        # Los reportes anteriores no guardaban storage_key
+        storage_key = report.get("storage_key") or f"reports/{report['filename']}"
+        return await get_storage().get_download_url(storage_key)
+
     async def get_stats(self):
         db = self.get_db()
         total = await db.reports.count_documents({})
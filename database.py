@@ -1,14 +1,49 @@
+import logging
+from typing import Dict, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 from config import settings
+from services.metrics import mongo_command_listener, mongo_pool_listener
+
+logger = logging.getLogger(__name__)
 
 class Database:
     client: AsyncIOMotorClient = None
     db = None
 
+    def __init__(self):
+        # Índices que no se pudieron crear al iniciar (colección.índice -> error)
+        self.index_errors: Dict[str, str] = {}
+
 db = Database()
 
+def mongo_client_options() -> dict:
+    """Opciones definidas explícitamente en settings.
+
+    pymongo da prioridad a los argumentos sobre las opciones de la URI, así que
+    las no definidas no se pasan para respetar lo que diga MONGODB_URL.
+    """
+    options = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxConnecting": settings.MONGODB_MAX_CONNECTING,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+        "compressors": settings.MONGODB_COMPRESSORS or None,
+        "readPreference": settings.MONGODB_READ_PREFERENCE,
+        "appname": settings.MONGODB_APP_NAME,
+    }
+    return {name: value for name, value in options.items() if value is not None}
+
 async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db.client = AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        event_listeners=[mongo_command_listener, mongo_pool_listener],
+        **mongo_client_options()
+    )
     db.db = db.client[settings.MONGODB_DB_NAME]
     print("✅ Conectado a MongoDB")
 
@@ -17,4 +52,25 @@ async def close_mongo_connection():
     print("❌ Desconectado de MongoDB")
 
 def get_database():
-    return db.db
\ No newline at end of file
+    return db.db
+
+async def create_index(collection, keys, **kwargs) -> Optional[str]:
+    """Crear un índice al iniciar la aplicación.
+
+    Un índice único que no se puede crear (p. ej. por datos duplicados) detiene
+    el arranque: es la única protección contra duplicados. Si falla uno que no
+    es único, el error se registra y se informa en /health/ready.
+    """
+    name = f"{collection.name}.{kwargs.get('name') or keys}"
+    try:
+        index_name = await collection.create_index(keys, **kwargs)
+    except OperationFailure as e:
+        if kwargs.get("unique"):
+            raise RuntimeError(
+                f"No se pudo crear el índice único {name}; corrija los duplicados antes de iniciar: {e}"
+            ) from e
+        db.index_errors[name] = str(e)
+        logger.error("No se pudo crear el índice %s: %s", name, e)
+        return None
+    db.index_errors.pop(name, None)
+    return index_name
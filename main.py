@@ -1,8 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from config import settings
 from database import connect_to_mongo, close_mongo_connection
+from services.product_catalog import product_catalog
+from controllers.auth_controller import auth_controller
+from controllers.employee_controller import employee_controller
+from controllers.processed_excel_controller import processed_excel_controller
+from controllers.product_controller import product_controller
+from controllers.report_controller import report_controller
 from routes.product_routes import router as product_router
 from routes.report_routes import router as report_router
 from routes.auth_routes import router as auth_router
@@ -10,13 +17,26 @@ from routes.employee_routes import router as employee_router
 from routes.history_routes import router as history_router
 from routes.processed_excel_routes import router as processed_excel_router
 from routes.excel_routes import router as excel_router
+from routes.storage_routes import router as storage_router
+from routes.metrics_routes import router as metrics_router
+from routes.health_routes import router as health_router
+from services.metrics import MetricsMiddleware
 from routes import perfil_routes
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    # Los índices únicos deben existir antes de aceptar escrituras
+    for controller in (
+        auth_controller, employee_controller, processed_excel_controller, product_controller, report_controller
+    ):
+        await controller.ensure_indexes()
+    await processed_excel_controller.ensure_line_items(settings.BACKFILL_PROCESSED_PRODUCTS_ON_STARTUP)
+    await product_catalog.load()
+    product_catalog.start_watching()
     print("Aplicación iniciada")
     yield
+    await product_catalog.stop_watching()
     await close_mongo_connection()
     print("Aplicación detenida")
     
@@ -27,6 +47,12 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
@@ -35,6 +61,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Último en agregarse, primero en ejecutarse: mide la petición completa
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(product_router)
 app.include_router(report_router)
 app.include_router(auth_router)
@@ -43,6 +72,9 @@ app.include_router(history_router)
 app.include_router(processed_excel_router)
 app.include_router(excel_router)
 app.include_router(perfil_routes.router)
+app.include_router(storage_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
 
 @app.get("/")
 def root():
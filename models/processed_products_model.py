@@ -2,7 +2,10 @@
 
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, create_model, model_validator
+
+# Formato columnar: un arreglo por campo en lugar de un objeto por línea
+COLUMNAR_MEDIA_TYPE = "application/vnd.quotizador.columnar+json"
 
 class ProductoDetalle(BaseModel):
     num_item: Optional[str] = None
@@ -27,6 +30,44 @@ class ProductoDetalle(BaseModel):
     precio_venta: Optional[float] = None
     total: Optional[float] = None
 
+class _ProductosColumnasBase(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    def _columns(self) -> dict:
+        return {
+            name: getattr(self, name)
+            for name in type(self).model_fields
+            if getattr(self, name) is not None
+        }
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if len({len(values) for values in self._columns().values()}) > 1:
+            raise ValueError("Todas las columnas de productos deben tener la misma longitud")
+        return self
+
+    def to_rows(self) -> List[dict]:
+        """Líneas con solo las columnas enviadas, como model_dump(exclude_unset=True)"""
+        columns = self._columns()
+        if not columns:
+            return []
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    @staticmethod
+    def columns_from_rows(rows: List[dict]) -> dict:
+        """Columnas completas a partir de líneas ya validadas (sin volver a validar)"""
+        return {name: [row.get(name) for row in rows] for name in ProductoDetalle.model_fields}
+
+ProductosColumnas = create_model(
+    "ProductosColumnas",
+    __base__=_ProductosColumnasBase,
+    **{
+        name: (Optional[List[field.annotation]], None)
+        for name, field in ProductoDetalle.model_fields.items()
+    }
+)
+
 class ProcessedExcelModel(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
     
@@ -41,6 +82,32 @@ class ProcessedExcelModel(BaseModel):
     resumen_estadistico: Optional[dict] = None 
     created_at: Optional[datetime] = None
 
+class ProcessedExcelColumnarModel(BaseModel):
+    """ProcessedExcelModel con `productos` en columnas; se valida columna a columna"""
+    model_config = ConfigDict(populate_by_name=True)
+
+    history_id: str
+    num_deal: str
+    num_oferta: str
+    revision: str
+    cliente: str
+    nombre_archivo: str
+    productos: ProductosColumnas
+    total_productos: int
+    resumen_estadistico: Optional[dict] = None
+    created_at: Optional[datetime] = None
+
+    def to_document(self) -> dict:
+        document = self.model_dump(exclude_unset=True, exclude={"productos"})
+        document["productos"] = self.productos.to_rows()
+        return document
+
+class ProcessedExcelCommit(BaseModel):
+    """Confirma un Excel parseado en /api/process-excel-for-db sin reenviar sus productos"""
+    handle: str
+    history_id: str
+    nombre_archivo: Optional[str] = None
+
 class ProcessedExcelResponse(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
     
@@ -54,4 +121,24 @@ class ProcessedExcelResponse(BaseModel):
     productos: List[ProductoDetalle]
     total_productos: int
     resumen_estadistico: Optional[dict] = None
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+class ProcessedProductLine(ProductoDetalle):
+    """Línea de producto de la colección processed_products"""
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias="_id")
+    processed_excel_id: str
+    history_id: str
+    line_index: int
+    num_deal: str
+    num_oferta: str
+    revision: str
+    cliente: str
+    created_at: datetime
+
+class ProcessedProductLineList(BaseModel):
+    total: int
+    skip: int
+    limit: int
+    data: List[ProcessedProductLine]
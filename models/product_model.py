@@ -1,7 +1,7 @@
 # models/product_model.py
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 class ProductModel(BaseModel):
@@ -36,4 +36,13 @@ class ProductResponse(BaseModel):
     area2: Optional[int] = None
     activo: bool = True
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+class ProductResolveRequest(BaseModel):
+    codes: List[str] = Field(default_factory=list)
+    processed_excel_id: Optional[str] = None
+
+class ProductResolveResponse(BaseModel):
+    productos: List[ProductResponse]
+    missing: List[str]
+    total_codes: int
\ No newline at end of file
@@ -8,6 +8,11 @@ class ErrorDetail(BaseModel):
     file: str = Field(..., description="Nombre del archivo con error")
     error: str = Field(..., description="Mensaje de error")
 
+class InputFileDetail(BaseModel):
+    filename: str = Field(..., description="Nombre del archivo de entrada")
+    sha256: str = Field(..., description="Hash SHA-256 del contenido")
+    fragment_key: Optional[str] = Field(None, description="Fragmento Parquet con el resultado procesado")
+
 class ReportModel(BaseModel):
     id: str = Field(default_factory=str, alias="_id")
     filename: str = Field(...)
@@ -20,6 +25,11 @@ class ReportModel(BaseModel):
     download_url: Optional[str] = Field(None)
     processing_time: float = Field(..., ge=0)
     errors: List[ErrorDetail] = Field(default_factory=list)
+    storage_key: Optional[str] = Field(None)
+    input_files: List[InputFileDetail] = Field(default_factory=list)
+    input_set_hash: Optional[str] = Field(None)
+    parser_version: Optional[str] = Field(None)
+    timings: Optional[dict] = Field(None, description="Tiempos de pared y CPU por etapa y por archivo")
     error_message: Optional[str] = Field(None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -56,4 +56,10 @@ async def login(usuario_login: UsuarioLogin):
         "es_lider": usuario["es_lider"],
         "webhook_bitrix": usuario["webhook_bitrix"],
         "fecha_creacion": usuario["fecha_creacion"],
-    }
\ No newline at end of file
+        "access_token": auth_controller.crear_token(usuario),
+        "token_type": "bearer",
+    }
+
+@router.get("/me")
+async def obtener_sesion(usuario: dict = Depends(obtener_usuario_actual)):
+    return usuario
\ No newline at end of file
@@ -9,6 +9,8 @@ router = APIRouter(prefix="/api/employees", tags=["Employees"])
 async def create_employee(employee: EmployeeCreate):
     try:
         return await employee_controller.create_employee(employee)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
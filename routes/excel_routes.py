@@ -1,6 +1,7 @@
 # routes/excel_routes.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from controllers.processed_excel_controller import processed_excel_controller
 from services.excel_processor import excel_processor
 import os
 import shutil
@@ -9,7 +10,10 @@ from config import settings
 router = APIRouter(prefix="/api/process-excel-for-db", tags=["Excel Processing"])
 
 @router.post("")
-async def process_excel_for_db(file: UploadFile = File(...)):
+async def process_excel_for_db(
+    file: UploadFile = File(...),
+    include_productos: bool = Query(True, description="Incluir la lista de productos en la respuesta")
+):
     temp_path = None
     try:
         temp_path = os.path.join(settings.TEMP_FOLDER, file.filename)
@@ -19,6 +23,10 @@ async def process_excel_for_db(file: UploadFile = File(...)):
         
         if not result.get("success"):
             raise HTTPException(status_code=400, detail=result.get("error", "Error al procesar archivo"))
+        # El resultado queda en el servidor: se confirma con POST /api/processed-excels/commit
+        result.update(await processed_excel_controller.stage_parsed_excel(result, file.filename))
+        if not include_productos:
+            del result["productos"]
         return result
         
     except Exception as e:
@@ -0,0 +1,48 @@
+# routes/health_routes.py
+
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException
+from config import settings
+from database import db, get_database
+from services.metrics import mongo_pool_listener
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def liveness():
+    """El proceso responde; no consulta dependencias"""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    """Listo para recibir tráfico si MongoDB responde al ping; incluye el estado del pool
+    y los índices que no se pudieron crear al iniciar"""
+    start = time.perf_counter()
+    error = None
+    try:
+        await asyncio.wait_for(
+            get_database().command("ping"),
+            timeout=settings.MONGODB_PING_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    ping_ms = round((time.perf_counter() - start) * 1000, 2)
+    pool = {
+        "max_pool_size": db.client.options.pool_options.max_pool_size if db.client else None,
+        "servers": mongo_pool_listener.stats()
+    }
+    if error:
+        raise HTTPException(
+            status_code=503,
+            detail={"status": "unavailable", "mongodb": {"error": error, "pool": pool}}
+        )
+    if db.index_errors:
+        # Responde, pero faltan índices no únicos (los únicos detienen el arranque)
+        return {
+            "status": "degraded",
+            "mongodb": {"ping_ms": ping_ms, "pool": pool, "index_errors": db.index_errors}
+        }
+    return {"status": "ok", "mongodb": {"ping_ms": ping_ms, "pool": pool}}
@@ -1,6 +1,7 @@
 from typing import Optional
-from fastapi import APIRouter, Query, Body, Path
+from fastapi import APIRouter, Query, Body, Path, HTTPException, Request, Response
 from controllers.history_controller import history_controller
+from services.http_cache import document_etag, etag_matches, not_modified, set_etag
 from models.history_model import HistoryModel, HistoryResponse
 router = APIRouter(prefix="/api/history", tags=["History"])
 @router.get("", response_model=dict)  
@@ -33,7 +34,14 @@ async def get_history_by_deal(num_deal: str = Path(...)):
     return await history_controller.get_history_by_deal(num_deal)
 
 @router.get("/{history_id}", response_model=HistoryResponse)
-async def get_history_by_id(history_id: str = Path(...)):
+async def get_history_by_id(request: Request, response: Response, history_id: str = Path(...)):
+    stamp = await history_controller.get_history_stamp(history_id)
+    if not stamp:
+        raise HTTPException(status_code=404, detail="Entrada de historial no encontrada")
+    etag = document_etag(stamp)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return await history_controller.get_history_by_id(history_id)
 
 @router.post("", response_model=HistoryResponse, status_code=201)  # SIN barra
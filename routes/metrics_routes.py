@@ -0,0 +1,39 @@
+# routes/metrics_routes.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.metrics import metrics, register_cache_metrics, register_gauges
+from services.password_hasher import password_hasher
+from services.product_catalog import product_catalog
+from services.storage import get_storage
+from services.token_service import token_service
+from services.user_cache import user_cache
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _signed_url_stats() -> dict:
+    stats = get_storage().stats()["signed_url_cache"]
+    lookups = stats["hits"] + stats["misses"]
+    return {**stats, "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0}
+
+
+register_cache_metrics({
+    "product_catalog": product_catalog.stats,
+    "user_cache": user_cache.stats,
+    "token_cache": token_service.stats,
+    "signed_urls": _signed_url_stats,
+})
+register_gauges(
+    "password_hasher",
+    "Cola y tiempos del pool de bcrypt",
+    password_hasher.stats,
+    ("queued", "running", "completed", "avg_wait_ms", "max_wait_ms", "avg_run_ms")
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
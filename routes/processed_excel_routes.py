@@ -1,24 +1,144 @@
 # routes/processed_excel_routes.py
 
-from typing import Optional
-from fastapi import APIRouter, Query, Body, Path, HTTPException
+from typing import Annotated, Optional, Union
+from fastapi import APIRouter, Query, Body, Path, HTTPException, Request
+from pydantic import Field
 from fastapi.responses import StreamingResponse
 from controllers.processed_excel_controller import processed_excel_controller
-from models.processed_products_model import ProcessedExcelModel, ProcessedExcelResponse
+from services.fast_json import FastJSONResponse
+from services.http_cache import document_etag, etag_matches, not_modified, set_etag
+from models.processed_products_model import (
+    COLUMNAR_MEDIA_TYPE,
+    ProcessedExcelColumnarModel,
+    ProcessedExcelCommit,
+    ProcessedExcelModel,
+    ProcessedExcelResponse,
+    ProcessedProductLineList,
+    ProductosColumnas,
+)
 from datetime import datetime
 
 router = APIRouter(prefix="/api/processed-excels", tags=["Processed Excels"])
 
-@router.post("", response_model=ProcessedExcelResponse, status_code=201)
-async def save_processed_excel(data: ProcessedExcelModel = Body(...)):
-    return await processed_excel_controller.save_processed_excel(data)
+# Se prueba primero el formato columnar: un `productos` en filas lo descarta de inmediato
+ProcessedExcelInput = Annotated[
+    Union[ProcessedExcelColumnarModel, ProcessedExcelModel],
+    Field(union_mode="left_to_right")
+]
+FORMAT_PATTERN = "^(rows|columnar)$"
+
+def wants_columnar(request: Request, formato: Optional[str]) -> bool:
+    """`?format=` manda; si no, el formato del cuerpo enviado o el que pide Accept"""
+    if formato:
+        return formato == "columnar"
+    return (
+        COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+        or request.headers.get("content-type", "").startswith(COLUMNAR_MEDIA_TYPE)
+    )
+
+def excel_response(result: dict, columnar: bool, status_code: int = 200) -> FastJSONResponse:
+    if columnar:
+        result = {**result, "productos": ProductosColumnas.columns_from_rows(result["productos"])}
+        return FastJSONResponse(result, status_code=status_code, media_type=COLUMNAR_MEDIA_TYPE)
+    return FastJSONResponse(result, status_code=status_code)
+
+@router.post(
+    "",
+    response_model=ProcessedExcelResponse,
+    status_code=201,
+    openapi_extra={"requestBody": {"content": {COLUMNAR_MEDIA_TYPE: {
+        "schema": {"$ref": "#/components/schemas/ProcessedExcelColumnarModel"}
+    }}}}
+)
+async def save_processed_excel(
+    request: Request,
+    data: ProcessedExcelInput = Body(...),
+    formato: Optional[str] = Query(None, alias="format", pattern=FORMAT_PATTERN)
+):
+    result = await processed_excel_controller.save_processed_excel(data)
+    return excel_response(result, wants_columnar(request, formato), status_code=201)
+
+@router.post("/commit", response_model=ProcessedExcelResponse, status_code=201)
+async def commit_staged_excel(
+    request: Request,
+    data: ProcessedExcelCommit = Body(...),
+    formato: Optional[str] = Query(None, alias="format", pattern=FORMAT_PATTERN)
+):
+    result = await processed_excel_controller.commit_staged_excel(data)
+    return excel_response(result, wants_columnar(request, formato), status_code=201)
 
 @router.get("/history/{history_id}", response_model=ProcessedExcelResponse)
-async def get_by_history_id(history_id: str = Path(...)):
-    result = await processed_excel_controller.get_by_history_id(history_id)
+async def get_by_history_id(
+    request: Request,
+    history_id: str = Path(...),
+    formato: Optional[str] = Query(None, alias="format", pattern=FORMAT_PATTERN),
+    include_productos: bool = Query(True, description="false: solo cabecera y resumen_estadistico (productos = null)")
+):
+    stamp = await processed_excel_controller.get_stamp_by_history_id(history_id)
+    if not stamp:
+        raise HTTPException(status_code=404, detail="Excel procesado no encontrado")
+    columnar = wants_columnar(request, formato) and include_productos
+    etag = document_etag(stamp, "columnar" if columnar else "rows", include_productos)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    result = await processed_excel_controller.get_by_history_id(history_id, include_productos=include_productos)
     if not result:
         raise HTTPException(status_code=404, detail="Excel procesado no encontrado")
-    return result
+    response = excel_response(result, columnar)
+    set_etag(response, etag)
+    response.headers["Vary"] = "Accept"
+    return response
+
+@router.get("/history/{history_id}/productos", response_model=ProcessedProductLineList)
+async def get_line_items(
+    history_id: str = Path(...),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    sort_by: str = Query("line_index", description="line_index o cualquier campo de ProductoDetalle"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    departamento: Optional[str] = Query(None),
+    marca: Optional[str] = Query(None),
+    familia: Optional[str] = Query(None)
+):
+    if not await processed_excel_controller.get_stamp_by_history_id(history_id):
+        raise HTTPException(status_code=404, detail="Excel procesado no encontrado")
+    result = await processed_excel_controller.get_line_items(
+        history_id,
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        descending=order == "desc",
+        departamento=departamento,
+        marca=marca,
+        familia=familia
+    )
+    return FastJSONResponse(result)
+
+@router.get("/productos", response_model=ProcessedProductLineList)
+async def search_line_items(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    fecha_inicio: Optional[str] = Query(None, description="Formato: YYYY-MM-DD"),
+    fecha_fin: Optional[str] = Query(None, description="Formato: YYYY-MM-DD"),
+    num_deal: Optional[str] = Query(None),
+    cliente: Optional[str] = Query(None),
+    departamento: Optional[str] = Query(None),
+    codigo_completo: Optional[str] = Query(None),
+    marca: Optional[str] = Query(None),
+    familia: Optional[str] = Query(None)
+):
+    return await processed_excel_controller.search_line_items(
+        skip=skip,
+        limit=limit,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        num_deal=num_deal,
+        cliente=cliente,
+        departamento=departamento,
+        codigo_completo=codigo_completo,
+        marca=marca,
+        familia=familia
+    )
 
 @router.get("/export/stats")
 async def get_export_stats(
@@ -36,14 +156,18 @@ async def export_to_excel(
     fecha_fin: Optional[str] = Query(None, description="Formato: YYYY-MM-DD"),
     num_deal: Optional[str] = Query(None),
     cliente: Optional[str] = Query(None),
-    departamento: Optional[str] = Query(None)
+    departamento: Optional[str] = Query(None),
+    codigo_completo: Optional[str] = Query(None),
+    marca: Optional[str] = Query(None)
 ):
     output = await processed_excel_controller.export_to_excel(
         fecha_inicio=fecha_inicio,
         fecha_fin=fecha_fin,
         num_deal=num_deal,
         cliente=cliente,
-        departamento=departamento
+        departamento=departamento,
+        codigo_completo=codigo_completo,
+        marca=marca
     )
     
     filename = f"consolidado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
@@ -1,31 +1,74 @@
 # routes/product_routes.py
 
-from typing import Optional
-from fastapi import APIRouter, Query, Body, Path
+from typing import List, Optional
+from fastapi import APIRouter, Query, Body, Path, UploadFile, File, HTTPException, Request, Response
 from controllers.product_controller import product_controller
-from models.product_model import ProductModel, ProductUpdate, ProductResponse
+from services.http_cache import etag_matches, make_etag, not_modified, set_etag
+from models.product_model import (
+    ProductModel,
+    ProductUpdate,
+    ProductResponse,
+    ProductResolveRequest,
+    ProductResolveResponse,
+)
 
 router = APIRouter(prefix="/api/products", tags=["Products"])
 
 @router.get("", response_model=dict)
 async def get_all_products(
+    request: Request,
+    response: Response,
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=100, ge=1, le=500),
     search: Optional[str] = Query(default=None)
 ):
+    total, last_update = await product_controller.get_catalog_version()
+    etag = make_etag("productos", total, last_update, skip, limit, search)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return await product_controller.get_all_products(
         skip=skip,
         limit=limit,
         search=search
     )
 
+@router.post("/import", response_model=dict)
+async def import_products(
+    file: UploadFile = File(..., description="Catálogo en formato XLSX o CSV"),
+    ordered: bool = Query(default=False, description="Detener la importación en el primer error")
+):
+    if not file.filename.lower().endswith(('.xlsx', '.xlsm', '.csv')):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Archivo {file.filename} no es un XLSX o CSV válido"
+        )
+    content = await file.read()
+    return await product_controller.import_products(content, file.filename, ordered=ordered)
+
+@router.post("/resolve", response_model=ProductResolveResponse)
+async def resolve_product_codes(
+    data: ProductResolveRequest = Body(..., description="Códigos a resolver o ID de un Excel procesado")
+):
+    return await product_controller.resolve_codes(data)
+
+@router.get("/catalog/stats", response_model=dict)
+async def get_catalog_stats():
+    return product_controller.get_catalog_stats()
+
+@router.get("/unidad-negocio/{unidad_negocio}", response_model=List[ProductResponse])
+async def get_products_by_unidad_negocio(
+    unidad_negocio: str = Path(..., description="Unidad de negocio"),
+    area: Optional[int] = Query(default=None)
+):
+    return await product_controller.get_products_by_unidad_negocio(unidad_negocio, area=area)
+
 @router.get("/code/{code}", response_model=ProductResponse)
 async def get_product_by_code(
     code: str = Path(..., description="Código del producto")
 ):
     product = await product_controller.get_product_by_code(code)
     if not product:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return product
 
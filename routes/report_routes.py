@@ -1,18 +1,40 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse
 from typing import List
 from controllers.report_controller import report_controller
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
 @router.post("/generate")  # Mantén este con barra porque es específico
-async def generate_report(files: List[UploadFile] = File(...)):
+async def generate_report(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    force: bool = Query(default=False, description="Regenerar aunque exista un reporte con los mismos archivos"),
+    profile: bool = Query(default=False, description="Guardar un volcado de cProfile de cada archivo")
+):
+    for file in files:
+        if not file.filename.endswith(('.xlsx', '.xls', '.xlsm')):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Archivo {file.filename} no es un archivo Excel válido"
+            )
+    return await report_controller.generate_report(
+        files, force=force, profile=profile, base_url=str(request.base_url)
+    )
+
+@router.post("/{report_id}/append")
+async def append_to_report(
+    report_id: str,
+    files: List[UploadFile] = File(...),
+    profile: bool = Query(default=False, description="Guardar un volcado de cProfile de cada archivo")
+):
     for file in files:
         if not file.filename.endswith(('.xlsx', '.xls', '.xlsm')):
             raise HTTPException(
                 status_code=400,
                 detail=f"Archivo {file.filename} no es un archivo Excel válido"
             )
-    return await report_controller.generate_report(files)
+    return await report_controller.append_to_report(report_id, files, profile=profile)
 
 @router.get("/history")
 async def get_reports_history(
@@ -25,6 +47,11 @@ async def get_reports_history(
 async def get_report_stats():
     return await report_controller.get_stats()
 
+@router.get("/{report_id}/download")
+async def download_report(report_id: str):
+    url = await report_controller.get_download_url(report_id)
+    return RedirectResponse(url=url, status_code=307)
+
 @router.get("/{report_id}")
 async def get_report_by_id(report_id: str):
     return await report_controller.get_report_by_id(report_id)
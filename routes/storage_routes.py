@@ -0,0 +1,38 @@
+import os
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import FileResponse, Response
+from services.storage import LocalStorage, MemoryStorage, get_storage, verify_url_signature
+
+router = APIRouter(prefix="/api/storage", tags=["Storage"])
+
+@router.get("/{key:path}")
+async def download_file(
+    key: str = Path(..., description="Ruta del objeto almacenado"),
+    expires: int = Query(..., description="Vencimiento de la URL firmada (epoch)"),
+    signature: str = Query(..., description="Firma de la URL")
+):
+    if not verify_url_signature(key, expires, signature):
+        raise HTTPException(status_code=403, detail="URL de descarga inválida o expirada")
+
+    storage = get_storage()
+    filename = key.rsplit("/", 1)[-1]
+
+    if isinstance(storage, LocalStorage):
+        try:
+            path = storage.local_path(key)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Ruta inválida")
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        return FileResponse(path, filename=filename)
+
+    if isinstance(storage, MemoryStorage):
+        if key not in storage.objects:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        return Response(
+            content=storage.objects[key],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+
+    raise HTTPException(status_code=404, detail="El almacenamiento configurado no sirve archivos localmente")
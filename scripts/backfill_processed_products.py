@@ -0,0 +1,28 @@
+"""Rellena la colección processed_products a partir de processed_excels.
+
+Paso obligatorio al desplegar sobre una base con cotizaciones anteriores a
+processed_products (o activar BACKFILL_PROCESSED_PRODUCTS_ON_STARTUP). Es
+idempotente y deja constancia en la colección migrations; mientras no se
+ejecute, la aplicación lo advierte al iniciar.
+
+Uso: python -m scripts.backfill_processed_products
+"""
+import asyncio
+from database import connect_to_mongo, close_mongo_connection
+from controllers.processed_excel_controller import processed_excel_controller
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        result = await processed_excel_controller.backfill_line_items()
+        print(
+            f"Cotizaciones procesadas: {result['processed_excels']}, "
+            f"líneas escritas: {result['line_items']}"
+        )
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""Convierte los `productos` ya guardados en processed_excels a otra codificación.
+
+Uso: python -m scripts.migrate_processed_excels_encoding [--encoding columnar-zstd|none]
+"""
+import argparse
+import asyncio
+from pymongo import UpdateOne
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.columnar_codec import (
+    DATA_FIELD, ENCODING_COLUMNAR_ZSTD, ENCODING_FIELD, ENCODINGS, decode_document, encode_document
+)
+
+
+def _update_for(excel: dict, encoding: str) -> UpdateOne:
+    productos = decode_document(excel).get("productos", [])
+    if encoding == ENCODING_COLUMNAR_ZSTD:
+        stored = encode_document({"productos": productos}, encoding)
+        return UpdateOne(
+            {"_id": excel["_id"]},
+            {"$set": {ENCODING_FIELD: encoding, DATA_FIELD: stored[DATA_FIELD]}, "$unset": {"productos": ""}}
+        )
+    return UpdateOne(
+        {"_id": excel["_id"]},
+        {"$set": {"productos": productos}, "$unset": {ENCODING_FIELD: "", DATA_FIELD: ""}}
+    )
+
+
+async def migrate(encoding: str, batch_size: int) -> int:
+    collection = get_database()["processed_excels"]
+    if encoding == ENCODING_COLUMNAR_ZSTD:
+        query = {ENCODING_FIELD: {"$ne": encoding}}
+    else:
+        query = {ENCODING_FIELD: {"$exists": True}}
+
+    migrated = 0
+    operations = []
+    async for excel in collection.find(query, batch_size=batch_size):
+        operations.append(_update_for(excel, encoding))
+        if len(operations) >= batch_size:
+            await collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+    return migrated
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migrar la codificación de processed_excels")
+    parser.add_argument("--encoding", choices=sorted(ENCODINGS), default=ENCODING_COLUMNAR_ZSTD)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        migrated = await migrate(args.encoding, args.batch_size)
+        print(f"Documentos migrados a '{args.encoding}': {migrated}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
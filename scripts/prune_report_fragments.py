@@ -0,0 +1,27 @@
+"""Borra los fragmentos Parquet de reportes sin cambios en REPORT_FRAGMENT_RETENTION_DAYS días.
+
+Los reportes afectados dejan de admitir ampliación y deben generarse de nuevo.
+Pensado para ejecutarse periódicamente (p. ej. una vez al día).
+
+Uso: python -m scripts.prune_report_fragments [--days N]
+"""
+import argparse
+import asyncio
+from config import settings
+from database import connect_to_mongo, close_mongo_connection
+from controllers.report_controller import report_controller
+
+
+async def main(days: int):
+    await connect_to_mongo()
+    try:
+        result = await report_controller.prune_fragments(days)
+        print(f"Reportes depurados: {result['reports']}, fragmentos liberados: {result['fragments']}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Depurar fragmentos de reportes antiguos")
+    parser.add_argument("--days", type=int, default=settings.REPORT_FRAGMENT_RETENTION_DAYS)
+    asyncio.run(main(parser.parse_args().days))
@@ -0,0 +1,109 @@
+from datetime import datetime
+from io import BytesIO
+from typing import List, Tuple
+import pandas as pd
+from pymongo import UpdateOne
+
+CATALOG_FIELDS = [
+    "code", "name_excel", "name_bitrix", "unidad_negocio", "area1", "area2", "activo"
+]
+REQUIRED_FIELDS = ["code", "name_excel", "unidad_negocio"]
+# Valores de los campos opcionales para productos nuevos cuando el archivo no trae la columna
+OPTIONAL_DEFAULTS = {"name_bitrix": None, "area1": None, "area2": None, "activo": True}
+TRUE_VALUES = {"true", "1", "si", "sí", "yes", "x", "activo"}
+FALSE_VALUES = {"false", "0", "no", "inactivo"}
+
+
+def read_catalog_file(content: bytes, filename: str) -> pd.DataFrame:
+    if filename.lower().endswith(".csv"):
+        df = pd.read_csv(BytesIO(content), dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(BytesIO(content), dtype=str, keep_default_na=False, engine="openpyxl")
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    return df
+
+
+def _integer_column(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Convierte una columna de texto a enteros; devuelve (valores, máscara de inválidos)"""
+    blank = series.str.strip() == ""
+    numbers = pd.to_numeric(series.where(~blank), errors="coerce")
+    invalid = ~blank & (numbers.isna() | (numbers % 1 != 0))
+    return numbers, invalid
+
+
+def validate_catalog(df: pd.DataFrame) -> Tuple[List[dict], List[dict]]:
+    """Valida el catálogo columna a columna y separa filas válidas de rechazadas.
+
+    Los datos de cada fila solo incluyen las columnas presentes en el archivo,
+    para no pisar campos que la carga no trae.
+    """
+    missing = [col for col in REQUIRED_FIELDS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(missing)}")
+    present = [col for col in CATALOG_FIELDS if col in df.columns]
+
+    df = df.reindex(columns=CATALOG_FIELDS, fill_value="").fillna("").astype(str)
+    for col in CATALOG_FIELDS:
+        df[col] = df[col].str.strip()
+
+    errors = pd.Series("", index=df.index)
+
+    def add_error(mask: pd.Series, message: str):
+        errors[mask] = errors[mask] + message + "; "
+
+    codes, invalid_code = _integer_column(df["code"])
+    add_error(codes.isna() & ~invalid_code, "code vacío")
+    add_error(invalid_code, "code debe ser un número entero")
+    add_error(df["name_excel"] == "", "name_excel vacío")
+    add_error(df["unidad_negocio"] == "", "unidad_negocio vacío")
+
+    area1, invalid_area1 = _integer_column(df["area1"])
+    area2, invalid_area2 = _integer_column(df["area2"])
+    add_error(invalid_area1, "area1 debe ser un número entero")
+    add_error(invalid_area2, "area2 debe ser un número entero")
+
+    activo_raw = df["activo"].str.lower()
+    invalid_activo = (activo_raw != "") & ~activo_raw.isin(TRUE_VALUES | FALSE_VALUES)
+    add_error(invalid_activo, "activo debe ser verdadero o falso")
+
+    duplicated = codes.notna() & codes.duplicated(keep="first")
+    add_error(duplicated, "code duplicado en el archivo")
+
+    # Número de fila tal como se ve en la hoja (encabezado en la fila 1)
+    row_numbers = df.index + 2
+    rejected_mask = errors != ""
+
+    rejected = [
+        {
+            "row": int(row),
+            "code": df.at[idx, "code"] or None,
+            "status": "rejected",
+            "error": errors[idx].rstrip("; ")
+        }
+        for idx, row in zip(df.index[rejected_mask], row_numbers[rejected_mask])
+    ]
+
+    valid = df[~rejected_mask]
+    rows = []
+    for idx in valid.index:
+        data = {
+            "code": int(codes[idx]),
+            "name_excel": valid.at[idx, "name_excel"],
+            "name_bitrix": valid.at[idx, "name_bitrix"] or None,
+            "unidad_negocio": valid.at[idx, "unidad_negocio"],
+            "area1": int(area1[idx]) if pd.notna(area1[idx]) else None,
+            "area2": int(area2[idx]) if pd.notna(area2[idx]) else None,
+            "activo": activo_raw[idx] not in FALSE_VALUES,
+        }
+        rows.append({"row": int(idx + 2), "data": {field: data[field] for field in present}})
+    return rows, rejected
+
+
+def build_upsert(data: dict, now: datetime) -> UpdateOne:
+    """Upsert por código que solo modifica los campos presentes en `data`"""
+    defaults = {field: value for field, value in OPTIONAL_DEFAULTS.items() if field not in data}
+    return UpdateOne(
+        {"code": data["code"]},
+        {"$set": {**data, "updated_at": now}, "$setOnInsert": {**defaults, "created_at": now}},
+        upsert=True
+    )
@@ -1,22 +1,98 @@
-from google.cloud import storage
-from config import settings
-import os
+import asyncio
+import functools
 import json
+import os
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+from config import settings
+from services.storage import StorageBackend
+
+MB = 1024 * 1024
+
+
+class CloudStorage(StorageBackend):
+    name = "gcs"
 
-class CloudStorage:
     def __init__(self):
-        creds_info = json.loads(os.getenv("GOOGLE_CREDENTIALS_JSON"))
-        self.client = storage.Client.from_service_account_info(creds_info)
-        self.bucket = self.client.bucket(settings.GOOGLE_STORAGE_BUCKET)
+        super().__init__()
+        # El cliente se crea en el primer uso para no penalizar el arranque
+        self._client = None
+        self._bucket = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.STORAGE_MAX_WORKERS,
+            thread_name_prefix="storage"
+        )
+
+    @staticmethod
+    def _build_client():
+        from google.cloud import storage
+
+        creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
+        if creds_json:
+            return storage.Client.from_service_account_info(json.loads(creds_json))
+        if settings.GOOGLE_CREDENTIALS_PATH:
+            return storage.Client.from_service_account_json(settings.GOOGLE_CREDENTIALS_PATH)
+        return storage.Client()
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    self._client = self._build_client()
+                    self._bucket = self._client.bucket(settings.GOOGLE_STORAGE_BUCKET)
+        return self._bucket
+
+    async def _run(self, operation: str, func, *args):
+        loop = asyncio.get_running_loop()
+        with self._timed(operation):
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def _upload(self, key: str, stream: BinaryIO, content_type: Optional[str]) -> int:
+        start = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell() - start
+        stream.seek(start)
+        blob = self.bucket.blob(key)
+        if size > settings.STORAGE_RESUMABLE_THRESHOLD_MB * MB:
+            blob.chunk_size = settings.STORAGE_CHUNK_SIZE_MB * MB
+        blob.upload_from_file(
+            stream,
+            size=size,
+            content_type=content_type,
+            timeout=settings.STORAGE_TIMEOUT_SECONDS
+        )
+        return size
+
+    def _signed_url(self, key: str, expires_in: int) -> str:
+        return self.bucket.blob(key).generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=expires_in),
+            method="GET"
+        )
+
+    def _download(self, key: str) -> bytes:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self.bucket.blob(key).download_as_bytes(timeout=settings.STORAGE_TIMEOUT_SECONDS)
+        except NotFound:
+            raise FileNotFoundError(key)
+
+    def _delete(self, key: str):
+        self.bucket.blob(key).delete(timeout=settings.STORAGE_TIMEOUT_SECONDS)
+
+    async def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> int:
+        return await self._run("upload", self._upload, key, stream, content_type)
 
-    async def upload_file(self, file_path: str, destination_name: str) -> str:
-        blob = self.bucket.blob(f"reports/{destination_name}")
-        blob.upload_from_filename(file_path)
-        blob.make_public() 
-        return blob.public_url
+    async def get_bytes(self, key: str) -> bytes:
+        return await self._run("download", self._download, key)
 
-    async def delete_file(self, file_path: str):
-        blob = self.bucket.blob(file_path)
-        blob.delete()
+    async def delete(self, key: str):
+        await self._run("delete", self._delete, key)
 
-cloud_storage = CloudStorage()
+    async def signed_url(self, key: str, expires_in: int) -> str:
+        return await self._run("sign_url", self._signed_url, key, expires_in)
@@ -0,0 +1,66 @@
+"""Codificación columnar comprimida de `productos` en processed_excels.
+
+Una cotización grande repite los 21 nombres de campo en cada línea. En modo
+"columnar-zstd" las líneas se guardan como un único binario: JSON con una
+lista de valores por columna, comprimido con zstd.
+"""
+import json
+from typing import List
+import zstandard
+from config import settings
+
+ENCODING_NONE = "none"
+ENCODING_COLUMNAR_ZSTD = "columnar-zstd"
+ENCODINGS = {ENCODING_NONE, ENCODING_COLUMNAR_ZSTD}
+FORMAT_VERSION = 1
+
+ENCODING_FIELD = "productos_encoding"
+DATA_FIELD = "productos_data"
+
+
+def encode_rows(rows: List[dict], level: int = None) -> bytes:
+    columns = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, None)
+    payload = {
+        "v": FORMAT_VERSION,
+        "n": len(rows),
+        "columns": {key: [row.get(key) for row in rows] for key in columns}
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    level = settings.PROCESSED_EXCEL_ZSTD_LEVEL if level is None else level
+    return zstandard.ZstdCompressor(level=level).compress(raw)
+
+
+def decode_rows(data: bytes) -> List[dict]:
+    payload = json.loads(zstandard.ZstdDecompressor().decompress(data))
+    if payload.get("v") != FORMAT_VERSION:
+        raise ValueError(f"Versión de codificación no soportada: {payload.get('v')}")
+    columns = payload["columns"]
+    names = list(columns)
+    if not names:
+        return [{} for _ in range(payload["n"])]
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def encode_document(doc: dict, encoding: str = None) -> dict:
+    """Copia del documento lista para guardar con la codificación indicada"""
+    encoding = encoding or settings.PROCESSED_EXCEL_ENCODING
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Codificación desconocida: {encoding}")
+    if encoding == ENCODING_NONE:
+        return dict(doc)
+    stored = {key: value for key, value in doc.items() if key != "productos"}
+    stored[ENCODING_FIELD] = encoding
+    stored[DATA_FIELD] = encode_rows(doc.get("productos", []))
+    return stored
+
+
+def decode_document(doc: dict) -> dict:
+    """Restaura `productos` en un documento leído de MongoDB (in place)"""
+    encoding = doc.pop(ENCODING_FIELD, None)
+    # Si una proyección excluyó las líneas no hay nada que decodificar
+    if encoding == ENCODING_COLUMNAR_ZSTD and DATA_FIELD in doc:
+        doc["productos"] = decode_rows(doc.pop(DATA_FIELD))
+    return doc
@@ -0,0 +1,61 @@
+"""Respuestas JSON rápidas para datos que ya pasaron validación.
+
+Los documentos leídos de nuestras colecciones se guardaron a partir de modelos
+validados; volver a construir el modelo Pydantic (cientos de `ProductoDetalle`
+por cotización) solo para serializarlo es trabajo repetido. `trusted_dump` da
+al documento la forma exacta del modelo de respuesta sin validar y
+`FastJSONResponse` lo serializa con orjson.
+"""
+from functools import lru_cache
+from typing import Any, Optional, Tuple, Type, get_args, get_origin
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _list_item_model(annotation) -> Optional[Type[BaseModel]]:
+    if get_origin(annotation) is list:
+        args = get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0]
+    return None
+
+
+@lru_cache(maxsize=None)
+def _model_fields(model: Type[BaseModel]) -> Tuple[tuple, ...]:
+    """(clave de salida, valor por defecto, submodelo de las listas) por campo"""
+    return tuple(
+        (
+            field.alias or name,
+            None if field.is_required() else field.get_default(call_default_factory=True),
+            _list_item_model(field.annotation),
+        )
+        for name, field in model.model_fields.items()
+    )
+
+
+def trusted_dump(model: Type[BaseModel], data: dict) -> dict:
+    """Documento con la forma de `model` (campos faltantes con su valor por defecto), sin validar"""
+    result = {}
+    for key, default, item_model in _model_fields(model):
+        value = data.get(key, default)
+        if item_model is not None and value is not None:
+            value = _trusted_list(item_model, value)
+        result[key] = value
+    return result
+
+
+def _trusted_list(model: Type[BaseModel], items: list) -> list:
+    fields = _model_fields(model)
+    if any(item_model is not None for _, _, item_model in fields):
+        return [trusted_dump(model, item) for item in items]
+    # Submodelo plano (p. ej. ProductoDetalle): una comprensión por línea
+    defaults = [(key, default) for key, default, _ in fields]
+    return [{key: item.get(key, default) for key, default in defaults} for item in items]
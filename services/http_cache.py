@@ -0,0 +1,42 @@
+"""ETags y respuestas 304 para GETs condicionales.
+
+Las ETags son débiles (`W/"..."`): identifican el contenido del recurso, no
+los bytes exactos, que cambian según la compresión que negocie el cliente.
+"""
+import hashlib
+from typing import Any
+from fastapi import Request, Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def document_etag(doc: dict, *parts: Any) -> str:
+    """ETag de un documento según su _id y su última modificación"""
+    return make_etag(doc["_id"], doc.get("updated_at") or doc.get("created_at"), *parts)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,430 @@
+"""Métricas en proceso con formato de exposición de Prometheus.
+
+Sin dependencias ni servicios externos: cada proceso (dyno) acumula sus
+contadores e histogramas en memoria y los publica en GET /metrics. Las
+métricas de caché se leen de los `stats()` existentes en el momento del scrape.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PARSE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Líneas de exposición de la métrica, sin HELP ni TYPE"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackGauge(_Metric):
+    """Valor calculado al exportar: `callback` devuelve [(valores de etiquetas, valor)]"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...],
+        callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        kind: str = "gauge"
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        try:
+            values = list(self.callback())
+        except Exception:
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # etiquetas -> [conteo por bucket (no acumulado), suma, total]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback_gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...],
+        callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        kind: str = "gauge"
+    ) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, labelnames, callback, kind))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    ("method", "route", "status")
+)
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso"
+)
+excel_pool_pending = metrics.gauge(
+    "excel_pool_pending_files",
+    "Archivos enviados al pool de procesos que aún no terminan"
+)
+excel_parse_duration = metrics.histogram(
+    "excel_parse_duration_seconds",
+    "Duración del parseo de cotizaciones por etapa",
+    ("stage",),
+    PARSE_BUCKETS
+)
+mongo_command_duration = metrics.histogram(
+    "mongodb_command_duration_seconds",
+    "Latencia de los comandos de MongoDB",
+    ("command", "status"),
+    MONGO_BUCKETS
+)
+storage_operation_duration = metrics.histogram(
+    "storage_operation_duration_seconds",
+    "Duración de las operaciones de almacenamiento de reportes",
+    ("backend", "operation")
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Registra la duración que informa el driver para cada comando"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, command=event.command_name, status="ok")
+
+    def failed(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, command=event.command_name, status="error")
+
+
+mongo_command_listener = MongoCommandMetrics()
+
+mongo_pool_checkout_wait = metrics.histogram(
+    "mongodb_pool_checkout_wait_seconds",
+    "Espera para obtener una conexión del pool de MongoDB",
+    ("address", "status"),
+    MONGO_BUCKETS
+)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Conexiones abiertas, en uso y en espera por servidor, a partir de los eventos del pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, dict] = {}
+
+    def _pool(self, address) -> dict:
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                "open": 0, "checked_out": 0, "waiting": 0, "checkouts": 0,
+                "checkout_failures": 0, "cleared": 0, "wait_total": 0.0, "wait_max": 0.0
+            }
+        return pool
+
+    def _update(self, address, **deltas):
+        with self._lock:
+            pool = self._pool(address)
+            for field, delta in deltas.items():
+                pool[field] += delta
+
+    def _checkout_done(self, event, status: str, **deltas):
+        # `duration` existe desde pymongo 4.7
+        duration = getattr(event, "duration", None)
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["waiting"] -= 1
+            for field, delta in deltas.items():
+                pool[field] += delta
+            if duration is not None:
+                pool["wait_total"] += duration
+                pool["wait_max"] = max(pool["wait_max"], duration)
+        if duration is not None:
+            mongo_pool_checkout_wait.observe(duration, address=f"{event.address[0]}:{event.address[1]}", status=status)
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._checkout_done(event, "error", checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._checkout_done(event, "ok", checked_out=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, checked_out=-1)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            pools = {address: dict(pool) for address, pool in self._pools.items()}
+        for pool in pools.values():
+            completed = pool["checkouts"] + pool["checkout_failures"]
+            wait_total = pool.pop("wait_total")
+            pool["avg_wait_ms"] = round(wait_total / completed * 1000, 3) if completed else 0
+            pool["max_wait_ms"] = round(pool.pop("wait_max") * 1000, 3)
+        return pools
+
+    def _collect(self, field: str) -> List[Tuple[LabelValues, float]]:
+        return [((address,), pool[field]) for address, pool in self.stats().items()]
+
+    def register(self):
+        for field, name, kind, documentation in (
+            ("open", "mongodb_pool_connections", "gauge", "Conexiones abiertas en el pool"),
+            ("checked_out", "mongodb_pool_connections_in_use", "gauge", "Conexiones prestadas a operaciones"),
+            ("waiting", "mongodb_pool_checkouts_waiting", "gauge", "Operaciones esperando una conexión"),
+            ("checkout_failures", "mongodb_pool_checkout_failures_total", "counter", "Esperas de conexión fallidas"),
+            ("cleared", "mongodb_pool_cleared_total", "counter", "Veces que se vació el pool"),
+        ):
+            metrics.callback_gauge(name, documentation, ("address",), lambda field=field: self._collect(field), kind)
+
+
+mongo_pool_listener = MongoPoolMetrics()
+mongo_pool_listener.register()
+
+
+def register_cache_metrics(caches: Dict[str, Callable[[], dict]]):
+    """Publica hits, misses, tasa de acierto y tamaño a partir de los `stats()` de cada caché"""
+
+    def collect(field: str) -> List[Tuple[LabelValues, float]]:
+        values = []
+        for cache, stats in caches.items():
+            value = stats().get(field)
+            if value is not None:
+                values.append(((cache,), value))
+        return values
+
+    for field, name, kind, documentation in (
+        ("hits", "cache_hits_total", "counter", "Aciertos acumulados de la caché"),
+        ("misses", "cache_misses_total", "counter", "Fallos acumulados de la caché"),
+        ("hit_rate", "cache_hit_ratio", "gauge", "Proporción de aciertos de la caché"),
+        ("size", "cache_entries", "gauge", "Entradas en la caché"),
+    ):
+        metrics.callback_gauge(
+            name,
+            documentation,
+            ("cache",),
+            lambda field=field: collect(field),
+            kind
+        )
+
+
+def register_gauges(name: str, documentation: str, stats: Callable[[], dict], fields: Iterable[str]):
+    """Un gauge por campo numérico de un `stats()`, con la etiqueta `field`"""
+    fields = tuple(fields)
+    metrics.callback_gauge(
+        name,
+        documentation,
+        ("field",),
+        lambda: [((field,), stats()[field]) for field in fields]
+    )
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latencia por plantilla de ruta y peticiones en curso"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            # Plantilla de la ruta (/api/history/{history_id}) para acotar la cardinalidad
+            path = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=path,
+                status=str(status["code"])
+            )
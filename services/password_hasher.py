@@ -0,0 +1,90 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from config import settings
+
+
+class PasswordHasher:
+    """Ejecuta bcrypt en un pool de hilos acotado para no bloquear el event loop"""
+
+    def __init__(self, rounds: int, max_workers: int):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.total_run_time = 0.0
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        enqueued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        started_at = time.perf_counter()
+        wait_time = started_at - enqueued_at
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        self.running += 1
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.total_run_time += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    @staticmethod
+    def _hash(contrasena: str, rounds: int) -> str:
+        return bcrypt.hashpw(contrasena.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verify(contrasena_plana: str, contrasena_hash) -> bool:
+        try:
+            return bcrypt.checkpw(
+                contrasena_plana.encode('utf-8'),
+                contrasena_hash.encode('utf-8') if isinstance(contrasena_hash, str) else contrasena_hash
+            )
+        except Exception as e:
+            print(f"Error verificando contraseña: {e}")
+            return False
+
+    async def hash(self, contrasena: str) -> str:
+        return await self._run(self._hash, contrasena, self.rounds)
+
+    async def verify(self, contrasena_plana: str, contrasena_hash) -> bool:
+        return await self._run(self._verify, contrasena_plana, contrasena_hash)
+
+    def needs_rehash(self, contrasena_hash) -> bool:
+        """True si el hash se generó con un costo distinto al configurado"""
+        if isinstance(contrasena_hash, bytes):
+            contrasena_hash = contrasena_hash.decode('utf-8')
+        try:
+            return int(contrasena_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "max_workers": self.max_workers,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "avg_wait_ms": round(self.total_wait_time / self.completed * 1000, 2) if self.completed else 0,
+            "max_wait_ms": round(self.max_wait_time * 1000, 2),
+            "avg_run_ms": round(self.total_run_time / self.completed * 1000, 2) if self.completed else 0
+        }
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    max_workers=settings.BCRYPT_MAX_WORKERS
+)
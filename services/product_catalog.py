@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from config import settings
+from database import get_database
+from models.product_model import ProductResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCatalog:
+    """Índice en memoria del catálogo de productos.
+
+    Se carga completo al iniciar y se recarga en la siguiente consulta cuando
+    `version` cambia: lo incrementan las escrituras de ProductController y,
+    si MongoDB lo soporta, un change stream sobre la colección. El change stream
+    se reabre con espera exponencial si se corta; mientras no esté abierto, las
+    consultas comparan cada `check_seconds` la cantidad de documentos y la
+    última modificación para detectar escrituras de otros procesos.
+    """
+
+    def __init__(self, check_seconds: float, max_backoff_seconds: float):
+        self.collection_name = "productos"
+        self.check_seconds = check_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.by_code: Dict[str, ProductResponse] = {}
+        self.by_unidad_negocio: Dict[str, List[ProductResponse]] = {}
+        self.by_area: Dict[int, List[ProductResponse]] = {}
+        self.version = 0
+        self.loaded_version = -1
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.skipped = 0
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._stream_open = False
+        self._fingerprint: Optional[tuple] = None
+        self._last_check = 0.0
+
+    def invalidate(self):
+        self.version += 1
+
+    async def read_fingerprint(self) -> tuple:
+        """(cantidad, última modificación) del catálogo; cambia con cada alta, edición o baja"""
+        collection = get_database()[self.collection_name]
+        total = await collection.estimated_document_count()
+        latest = await collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        return total, latest.get("updated_at") if latest else None
+
+    async def _check_external_changes(self):
+        now = time.monotonic()
+        if self._stream_open or now - self._last_check < self.check_seconds:
+            return
+        self._last_check = now
+        if await self.read_fingerprint() != self._fingerprint:
+            self.invalidate()
+
+    async def load(self):
+        version = self.version
+        by_code = {}
+        by_unidad_negocio = {}
+        by_area = {}
+        skipped = 0
+
+        fingerprint = await self.read_fingerprint()
+        cursor = get_database()[self.collection_name].find({})
+        async for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            try:
+                producto = ProductResponse(**doc)
+            except ValidationError as e:
+                # Un documento inválido no debe dejar vacío todo el catálogo
+                skipped += 1
+                logger.warning("Producto %s omitido del catálogo: %s", doc["_id"], e)
+                continue
+            by_code[str(producto.code)] = producto
+            by_unidad_negocio.setdefault(producto.unidad_negocio, []).append(producto)
+            for area in {producto.area1, producto.area2}:
+                if area is not None:
+                    by_area.setdefault(area, []).append(producto)
+
+        self.by_code = by_code
+        self.by_unidad_negocio = by_unidad_negocio
+        self.by_area = by_area
+        self.loaded_version = version
+        self.reloads += 1
+        self.skipped = skipped
+        self._fingerprint = fingerprint
+        self._last_check = time.monotonic()
+
+    async def ensure_loaded(self):
+        if self.loaded_version == self.version:
+            await self._check_external_changes()
+        if self.loaded_version == self.version:
+            return
+        async with self._lock:
+            if self.loaded_version != self.version:
+                await self.load()
+
+    async def get_by_code(self, code) -> Optional[ProductResponse]:
+        await self.ensure_loaded()
+        producto = self.by_code.get(str(code).strip())
+        if producto is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return producto
+
+    async def get_many(self, codes: List[str]) -> Tuple[List[ProductResponse], List[str]]:
+        await self.ensure_loaded()
+        found = []
+        missing = []
+        for code in codes:
+            producto = self.by_code.get(str(code).strip())
+            if producto is None:
+                missing.append(code)
+            else:
+                found.append(producto)
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    async def get_by_unidad_negocio(self, unidad_negocio: str, area: Optional[int] = None) -> List[ProductResponse]:
+        await self.ensure_loaded()
+        productos = self.by_unidad_negocio.get(unidad_negocio, [])
+        if area is not None:
+            productos = [p for p in productos if area in (p.area1, p.area2)]
+        return productos
+
+    async def get_by_area(self, area: int) -> List[ProductResponse]:
+        await self.ensure_loaded()
+        return self.by_area.get(area, [])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.by_code),
+            "version": self.version,
+            "loaded_version": self.loaded_version,
+            "reloads": self.reloads,
+            "skipped": self.skipped,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "watching_changes": self._stream_open
+        }
+
+    async def _watch_changes(self):
+        collection = get_database()[self.collection_name]
+        backoff = 1.0
+        warned = False
+        while True:
+            try:
+                async with collection.watch() as stream:
+                    self._stream_open = True
+                    backoff = 1.0
+                    warned = False
+                    async for _ in stream:
+                        self.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Sin replica set el change stream no existe; se sigue reintentando
+                # y mientras tanto ensure_loaded compara la huella del catálogo.
+                # Solo el primer fallo seguido se avisa, para no llenar el log
+                log = logger.debug if warned else logger.warning
+                log("Change stream de productos no disponible, reintento en %.0fs: %s", backoff, e)
+                warned = True
+            finally:
+                if self._stream_open:
+                    # Pudieron perderse eventos mientras se reabre
+                    self._stream_open = False
+                    self.invalidate()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff_seconds)
+
+    def start_watching(self):
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch_changes())
+
+    async def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+
+product_catalog = ProductCatalog(
+    check_seconds=settings.PRODUCT_CATALOG_CHECK_SECONDS,
+    max_backoff_seconds=settings.PRODUCT_CATALOG_WATCH_MAX_BACKOFF_SECONDS
+)
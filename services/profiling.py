@@ -0,0 +1,74 @@
+"""Tiempos por etapa (pared y CPU) y volcados de cProfile opcionales."""
+import cProfile
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+
+class StageTimer:
+    """Acumula el tiempo de pared y de CPU de cada etapa en orden de ejecución.
+
+    El tiempo de CPU es el del hilo que ejecuta la etapa: el trabajo que se
+    delega a otros hilos (p. ej. la subida al almacenamiento) no se suma. Las
+    etapas con `await` se marcan con `cpu=False` y solo miden tiempo de pared:
+    mientras esperan, el event loop ejecuta otras corrutinas en el mismo hilo
+    y su CPU se atribuiría a este reporte.
+    """
+
+    def __init__(self):
+        self.stages: List[dict] = []
+
+    @contextmanager
+    def stage(self, name: str, cpu: bool = True):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.stages.append({
+                "stage": name,
+                "wall_seconds": round(time.perf_counter() - wall_start, 4),
+                "cpu_seconds": round(time.thread_time() - cpu_start, 4) if cpu else None
+            })
+
+    @property
+    def wall_seconds(self) -> float:
+        return round(sum(stage["wall_seconds"] for stage in self.stages), 4)
+
+    @property
+    def cpu_seconds(self) -> float:
+        return round(sum(stage["cpu_seconds"] or 0 for stage in self.stages), 4)
+
+    def as_dict(self) -> dict:
+        return {
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "stages": self.stages
+        }
+
+
+def run_profiled(
+    func: Callable,
+    *args,
+    threshold_seconds: Optional[float] = None,
+    dump_path: Optional[str] = None
+) -> Tuple[object, Optional[str]]:
+    """Ejecuta `func` bajo cProfile si hay umbral; guarda el perfil solo si lo supera.
+
+    Devuelve (resultado, ruta del volcado o None). Con `threshold_seconds=None`
+    no se perfila; con 0 se guarda siempre.
+    """
+    if threshold_seconds is None or dump_path is None:
+        return func(*args), None
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        result = profiler.runcall(func, *args)
+    finally:
+        slow = time.perf_counter() - start >= threshold_seconds
+        if slow:
+            os.makedirs(os.path.dirname(dump_path) or ".", exist_ok=True)
+            profiler.dump_stats(dump_path)
+    return result, dump_path if slow else None
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from services.excel_processor import PARSER_VERSION
+from services.storage import StorageBackend
+
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+# Metadato con las columnas object guardadas como JSON y el nombre del índice de
+# columnas; sin él el fragmento es de un formato anterior que convertía tipos
+FRAGMENT_METADATA_KEY = b"fragment_format"
+DATETIME_TAG = "__datetime__"
+
+
+def fragment_key(file_hash: str) -> str:
+    # La versión del parser forma parte de la clave: un cambio en get_df invalida los fragmentos
+    return f"fragments/v{PARSER_VERSION}/{file_hash}.parquet"
+
+
+def _encode_value(value) -> str:
+    def default(obj):
+        if isinstance(obj, datetime):
+            return {DATETIME_TAG: obj.isoformat()}
+        raise TypeError(f"Tipo no serializable en un fragmento: {type(obj).__name__}")
+
+    return json.dumps(value, default=default)
+
+
+def _decode_value(text: str):
+    def object_hook(obj):
+        if DATETIME_TAG in obj:
+            return datetime.fromisoformat(obj[DATETIME_TAG])
+        return obj
+
+    return json.loads(text, object_hook=object_hook)
+
+
+def frame_to_parquet(df: pd.DataFrame) -> bytes:
+    """Serializar un DataFrame de get_df conservando los tipos de cada celda.
+
+    Parquet exige un tipo por columna: las columnas object (enteros y decimales
+    mezclados, números y texto) se guardan como JSON por celda para que 2354 no
+    vuelva como 2354.0 ni como "2354".
+    """
+    df = df.reset_index(drop=True)
+    json_columns = [column for column in df.columns if df[column].dtype == object]
+    encoded = df.copy()
+    for column in json_columns:
+        encoded[column] = df[column].map(_encode_value).astype(str)
+    table = pa.Table.from_pandas(encoded, preserve_index=False)
+    fragment_format = {"json_columns": json_columns, "columns_name": df.columns.name}
+    metadata = {**(table.schema.metadata or {}), FRAGMENT_METADATA_KEY: json.dumps(fragment_format).encode("utf-8")}
+    buffer = BytesIO()
+    pq.write_table(table.replace_schema_metadata(metadata), buffer)
+    return buffer.getvalue()
+
+
+def parquet_to_frame(data: bytes) -> Optional[pd.DataFrame]:
+    """DataFrame original, o None si el fragmento es de un formato anterior"""
+    table = pq.read_table(BytesIO(data))
+    fragment_format = (table.schema.metadata or {}).get(FRAGMENT_METADATA_KEY)
+    if fragment_format is None:
+        return None
+    fragment_format = json.loads(fragment_format)
+    df = table.to_pandas()
+    for column in fragment_format["json_columns"]:
+        df[column] = pd.Series([_decode_value(text) for text in df[column]], index=df.index, dtype=object)
+    df.columns.name = fragment_format["columns_name"]
+    return df
+
+
+async def save_fragments(storage: StorageBackend, frames: Dict[str, pd.DataFrame]) -> Dict[str, str]:
+    """Guardar un fragmento Parquet por archivo; devuelve hash -> clave"""
+    keys = {file_hash: fragment_key(file_hash) for file_hash in frames}
+    await asyncio.gather(*[
+        storage.put_stream(keys[file_hash], BytesIO(frame_to_parquet(df)), content_type=PARQUET_CONTENT_TYPE)
+        for file_hash, df in frames.items()
+    ])
+    return keys
+
+
+async def load_fragments(storage: StorageBackend, keys: List[str]) -> List[Optional[pd.DataFrame]]:
+    async def load(key: str) -> Optional[pd.DataFrame]:
+        try:
+            return parquet_to_frame(await storage.get_bytes(key))
+        except FileNotFoundError:
+            return None
+
+    return await asyncio.gather(*[load(key) for key in keys])
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Optional
+from config import require_secret_key, settings
+from services.metrics import storage_operation_duration
+
+
+_url_signing_key = require_secret_key().encode("utf-8")
+
+
+def _url_signature(key: str, expires: int) -> str:
+    return hmac.new(_url_signing_key, f"{key}:{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verify_url_signature(key: str, expires: int, signature: str) -> bool:
+    """Validar una URL firmada por LocalStorage o MemoryStorage"""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(signature, _url_signature(key, expires))
+
+
+class StorageBackend(ABC):
+    """Interfaz común de almacenamiento de reportes"""
+
+    name = "base"
+
+    def __init__(self):
+        self.timings = {}
+        self._signed_urls: Dict[str, tuple] = {}
+        self.signed_url_hits = 0
+        self.signed_url_misses = 0
+
+    @contextmanager
+    def _timed(self, operation: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = self.timings.setdefault(operation, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            storage_operation_duration.observe(elapsed, backend=self.name, operation=operation)
+
+    @abstractmethod
+    async def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> int:
+        """Guardar el contenido de un objeto tipo archivo; devuelve los bytes escritos"""
+
+    async def put_file(self, key: str, file_path: str, content_type: Optional[str] = None) -> int:
+        with open(file_path, "rb") as stream:
+            return await self.put_stream(key, stream, content_type)
+
+    @abstractmethod
+    async def get_bytes(self, key: str) -> bytes:
+        """Leer un objeto completo; FileNotFoundError si no existe"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Borrar un objeto"""
+
+    @abstractmethod
+    async def signed_url(self, key: str, expires_in: int) -> str:
+        """URL de descarga temporal; válida durante `expires_in` segundos"""
+
+    async def get_download_url(self, key: str) -> str:
+        """URL firmada reutilizada mientras le quede al menos la mitad de su vigencia"""
+        expiration = settings.SIGNED_URL_EXPIRATION_SECONDS
+        cached = self._signed_urls.get(key)
+        if cached and cached[1] - time.time() > expiration / 2:
+            self.signed_url_hits += 1
+            return cached[0]
+        self.signed_url_misses += 1
+        url = await self.signed_url(key, expiration)
+        self._signed_urls[key] = (url, time.time() + expiration)
+        return url
+
+    def forget_download_url(self, key: str):
+        self._signed_urls.pop(key, None)
+
+    def _local_signed_url(self, base_url: str, key: str, expires_in: int) -> str:
+        expires = int(time.time()) + expires_in
+        return f"{base_url}/api/storage/{quote(key)}?expires={expires}&signature={_url_signature(key, expires)}"
+
+    def stats(self) -> dict:
+        return {
+            **{
+                operation: {
+                    "count": stats["count"],
+                    "avg_seconds": round(stats["total_seconds"] / stats["count"], 4),
+                    "max_seconds": round(stats["max_seconds"], 4)
+                }
+                for operation, stats in self.timings.items()
+            },
+            "signed_url_cache": {
+                "size": len(self._signed_urls),
+                "hits": self.signed_url_hits,
+                "misses": self.signed_url_misses
+            }
+        }
+
+
+class LocalStorage(StorageBackend):
+    """Archivos en disco local, servidos por la ruta /api/storage"""
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str = ""):
+        super().__init__()
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def local_path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Ruta fuera del almacenamiento: {key}")
+        return path
+
+    def _write(self, key: str, stream: BinaryIO) -> int:
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(stream, target)
+            return target.tell()
+
+    async def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> int:
+        with self._timed("upload"):
+            return await asyncio.to_thread(self._write, key, stream)
+
+    def _read(self, key: str) -> bytes:
+        with open(self.local_path(key), "rb") as source:
+            return source.read()
+
+    async def get_bytes(self, key: str) -> bytes:
+        with self._timed("download"):
+            return await asyncio.to_thread(self._read, key)
+
+    async def delete(self, key: str):
+        with self._timed("delete"):
+            await asyncio.to_thread(os.remove, self.local_path(key))
+
+    async def signed_url(self, key: str, expires_in: int) -> str:
+        return self._local_signed_url(self.base_url, key, expires_in)
+
+
+class MemoryStorage(StorageBackend):
+    """Almacenamiento en memoria para pruebas y benchmarks"""
+
+    name = "memory"
+
+    def __init__(self, base_url: str = ""):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.objects: Dict[str, bytes] = {}
+
+    async def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> int:
+        with self._timed("upload"):
+            data = stream.read()
+            self.objects[key] = data
+            return len(data)
+
+    async def get_bytes(self, key: str) -> bytes:
+        with self._timed("download"):
+            if key not in self.objects:
+                raise FileNotFoundError(key)
+            return self.objects[key]
+
+    async def delete(self, key: str):
+        with self._timed("delete"):
+            if self.objects.pop(key, None) is None:
+                raise FileNotFoundError(key)
+
+    async def signed_url(self, key: str, expires_in: int) -> str:
+        return self._local_signed_url(self.base_url, key, expires_in)
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def build_storage(backend: str) -> StorageBackend:
+    if backend == "gcs":
+        from services.cloud_storage import CloudStorage
+        return CloudStorage()
+    if backend == "local":
+        return LocalStorage(settings.LOCAL_STORAGE_PATH, settings.PUBLIC_BASE_URL)
+    if backend == "memory":
+        return MemoryStorage(settings.PUBLIC_BASE_URL)
+    raise ValueError(f"STORAGE_BACKEND desconocido: {backend}")
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        _storage = build_storage(settings.STORAGE_BACKEND)
+    return _storage
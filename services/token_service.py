@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import require_secret_key, settings
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class TokenService:
+    """Tokens de acceso firmados con HMAC-SHA256, verificables sin consultar la base de datos.
+
+    Cada token lleva la `token_version` del usuario. Aquí solo se comprueban firma
+    y expiración: la revocación (versión vigente y usuario activo) la valida
+    AuthController contra el documento del usuario.
+    """
+
+    def __init__(self, secret_key: str, expire_minutes: int, cache_size: int):
+        self._secret = secret_key.encode("utf-8")
+        self.expire_seconds = expire_minutes * 60
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _sign(self, data: bytes) -> str:
+        return _b64encode(hmac.new(self._secret, data, hashlib.sha256).digest())
+
+    def create_token(self, usuario: dict) -> str:
+        now = int(time.time())
+        user_id = str(usuario["_id"])
+        version = usuario.get("token_version", 0)
+        payload = {
+            "sub": user_id,
+            "ini": usuario["iniciales"],
+            "nom": usuario["nombre"],
+            "ape": usuario["apellido"],
+            "lid": usuario.get("es_lider", False),
+            "ver": version,
+            "iat": now,
+            "exp": now + self.expire_seconds
+        }
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        return f"{body}.{self._sign(body.encode('ascii'))}"
+
+    def _decode(self, token: str) -> Optional[dict]:
+        try:
+            body, signature = token.split(".")
+            if not hmac.compare_digest(signature.encode("ascii"), self._sign(body.encode("ascii")).encode("ascii")):
+                return None
+            return json.loads(_b64decode(body))
+        except ValueError:
+            return None
+
+    def verify_token(self, token: str) -> Optional[dict]:
+        payload = self._cache.get(token)
+        if payload is not None:
+            self._cache.move_to_end(token)
+            self.hits += 1
+        else:
+            self.misses += 1
+            payload = self._decode(token)
+            if payload is None:
+                return None
+            self._cache[token] = payload
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if payload["exp"] < time.time():
+            self._cache.pop(token, None)
+            return None
+        return payload
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0
+        }
+
+
+token_service = TokenService(
+    secret_key=require_secret_key(),
+    expire_minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+    cache_size=settings.TOKEN_CACHE_SIZE
+)
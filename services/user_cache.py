@@ -0,0 +1,111 @@
+import time
+from typing import Dict, Optional, Tuple
+from pymongo import ReturnDocument
+from config import settings
+from database import get_database
+
+
+class UserCache:
+    """Caché en proceso de la colección usuarios, por _id y por iniciales.
+
+    Cada entrada expira tras `ttl_seconds` como red de seguridad. Para invalidar
+    entre nodos se usa un documento de versión en `cache_versions`: cada escritura
+    lo incrementa y cada nodo lo consulta como máximo una vez por intervalo,
+    vaciando su caché cuando cambia.
+    """
+
+    def __init__(self, ttl_seconds: int, version_check_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.version_collection = "cache_versions"
+        self.version_key = "usuarios"
+        self._by_id: Dict[str, Tuple[dict, float]] = {}
+        self._by_iniciales: Dict[str, str] = {}
+        self._version: Optional[int] = None
+        self._last_version_check = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self._by_id.clear()
+        self._by_iniciales.clear()
+
+    async def sync_version(self):
+        now = time.monotonic()
+        if now - self._last_version_check < self.version_check_seconds:
+            return
+        self._last_version_check = now
+        doc = await get_database()[self.version_collection].find_one({"_id": self.version_key})
+        version = doc["version"] if doc else 0
+        if self._version is not None and version != self._version:
+            self.clear()
+        self._version = version
+
+    def peek(self, usuario_id: str) -> Optional[dict]:
+        """Devuelve el usuario si está en caché y vigente, sin consultar la base de datos"""
+        entry = self._by_id.get(usuario_id)
+        if entry is None:
+            return None
+        usuario, expires_at = entry
+        if expires_at < time.monotonic():
+            self.remove(usuario_id)
+            return None
+        return usuario
+
+    async def get_by_id(self, usuario_id: str) -> Optional[dict]:
+        await self.sync_version()
+        usuario = self.peek(usuario_id)
+        if usuario is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(usuario)
+
+    async def get_by_iniciales(self, iniciales: str) -> Optional[dict]:
+        await self.sync_version()
+        usuario_id = self._by_iniciales.get(iniciales)
+        usuario = self.peek(usuario_id) if usuario_id else None
+        if usuario is None or usuario.get("iniciales") != iniciales:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(usuario)
+
+    def put(self, usuario: dict):
+        usuario_id = str(usuario["_id"])
+        previous = self._by_id.get(usuario_id)
+        if previous and previous[0].get("iniciales") != usuario.get("iniciales"):
+            self._by_iniciales.pop(previous[0].get("iniciales"), None)
+        self._by_id[usuario_id] = (dict(usuario), time.monotonic() + self.ttl_seconds)
+        self._by_iniciales[usuario["iniciales"]] = usuario_id
+
+    def remove(self, usuario_id: str):
+        entry = self._by_id.pop(usuario_id, None)
+        if entry:
+            self._by_iniciales.pop(entry[0].get("iniciales"), None)
+
+    async def bump_version(self):
+        """Notificar a los demás nodos que sus cachés de usuarios están desactualizadas"""
+        doc = await get_database()[self.version_collection].find_one_and_update(
+            {"_id": self.version_key},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._version = doc["version"]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._by_id),
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0
+        }
+
+
+user_cache = UserCache(
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    version_check_seconds=settings.USER_CACHE_VERSION_CHECK_SECONDS
+)
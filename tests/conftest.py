@@ -0,0 +1,24 @@
+import os
+import sys
+
+# config.Settings lee el entorno al importarse
+os.environ.setdefault("SECRET_KEY", "clave-de-pruebas")
+os.environ.setdefault("MONGODB_DB_NAME", "pruebas")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def mongo():
+    """Base de datos en memoria compatible con Motor (requiere mongomock-motor)"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import database
+
+    previous = database.db.client, database.db.db
+    database.db.client = mongomock_motor.AsyncMongoMockClient()
+    database.db.db = database.db.client[os.environ["MONGODB_DB_NAME"]]
+    yield database.db.db
+    database.db.client, database.db.db = previous
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from services.catalog_import import build_upsert, read_catalog_file, validate_catalog
+
+
+def _ops(csv: str):
+    rows, rejected = validate_catalog(read_catalog_file(csv.encode("utf-8"), "catalogo.csv"))
+    assert rejected == []
+    now = datetime(2026, 1, 1)
+    return [build_upsert(row["data"], now)._doc for row in rows], now
+
+
+def test_columnas_ausentes_no_se_sobrescriben():
+    docs, now = _ops("code,name_excel,unidad_negocio\n101,Tornillo,Ferretería\n")
+
+    assert docs[0]["$set"] == {
+        "code": 101, "name_excel": "Tornillo", "unidad_negocio": "Ferretería", "updated_at": now
+    }
+    # Los opcionales solo se fijan al crear el producto
+    assert docs[0]["$setOnInsert"] == {
+        "name_bitrix": None, "area1": None, "area2": None, "activo": True, "created_at": now
+    }
+
+
+def test_columnas_presentes_se_actualizan():
+    docs, now = _ops("code,name_excel,unidad_negocio,activo,area1\n7,Tuerca,Ferretería,no,3\n")
+
+    assert docs[0]["$set"]["activo"] is False
+    assert docs[0]["$set"]["area1"] == 3
+    assert docs[0]["$setOnInsert"] == {"name_bitrix": None, "area2": None, "created_at": now}
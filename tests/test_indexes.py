@@ -0,0 +1,27 @@
+import asyncio
+import pytest
+from database import db
+from controllers.product_controller import ProductController
+
+
+def test_indice_unico_con_duplicados_detiene_el_arranque(mongo, monkeypatch):
+    monkeypatch.setattr(db, "index_errors", {})
+
+    async def escenario():
+        await mongo.productos.insert_many([{"code": 1}, {"code": 1}])
+        await ProductController().ensure_indexes()
+
+    with pytest.raises(RuntimeError, match="productos.code"):
+        asyncio.run(escenario())
+
+
+def test_indices_creados_al_iniciar(mongo, monkeypatch):
+    monkeypatch.setattr(db, "index_errors", {})
+
+    async def escenario():
+        await ProductController().ensure_indexes()
+        return await mongo.productos.index_information()
+
+    indexes = asyncio.run(escenario())
+    assert indexes["code_1"]["unique"] is True
+    assert db.index_errors == {}
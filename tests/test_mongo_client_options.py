@@ -0,0 +1,27 @@
+from pymongo import MongoClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+import database
+from config import settings
+
+URI = "mongodb://localhost:27017/?readPreference=secondaryPreferred&maxPoolSize=5&appname=desde-uri"
+
+
+def _client(**options):
+    return MongoClient(URI, connect=False, **options)
+
+
+def test_sin_settings_se_respetan_las_opciones_de_la_uri():
+    options = database.mongo_client_options()
+    assert options == {}
+    client = _client(**options)
+    assert isinstance(client.read_preference, SecondaryPreferred)
+    assert client.options.pool_options.max_pool_size == 5
+    assert client.options.pool_options.metadata["application"]["name"] == "desde-uri"
+
+
+def test_settings_definidos_se_aplican(monkeypatch):
+    monkeypatch.setattr(settings, "MONGODB_MAX_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "MONGODB_READ_PREFERENCE", "primary")
+    client = _client(**database.mongo_client_options())
+    assert client.options.pool_options.max_pool_size == 20
+    assert isinstance(client.read_preference, Primary)
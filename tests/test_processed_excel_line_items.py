@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import pytest
+from fastapi import HTTPException
+from controllers.processed_excel_controller import BACKFILL_MIGRATION_ID, ProcessedExcelController
+
+
+def _cotizacion() -> dict:
+    return {
+        "history_id": "h1", "num_deal": "D1", "num_oferta": "O1", "revision": "0", "cliente": "Cliente",
+        "nombre_archivo": "cotizacion.xlsx", "total_productos": 2,
+        "productos": [{"num_item": 1, "marca": "AUMA"}, {"num_item": 2, "marca": "MSA"}],
+    }
+
+
+class _LineasQueFallan:
+    """processed_products que escribe la primera línea y falla en la segunda"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert_many(self, documents, ordered=True):
+        await self.collection.insert_one(documents[0])
+        raise RuntimeError("sin conexión")
+
+    async def delete_many(self, query):
+        return await self.collection.delete_many(query)
+
+
+def test_falla_de_lineas_elimina_la_cotizacion(mongo, monkeypatch):
+    controller = ProcessedExcelController()
+    monkeypatch.setattr(controller, "get_products_collection", lambda: _LineasQueFallan(mongo.processed_products))
+
+    async def escenario():
+        with pytest.raises(RuntimeError):
+            await controller._insert_excel(_cotizacion())
+        assert await mongo.processed_excels.count_documents({}) == 0
+        assert await mongo.processed_products.count_documents({}) == 0
+
+    asyncio.run(escenario())
+
+
+def test_backfill_pendiente_se_avisa_o_ejecuta(mongo, monkeypatch, caplog):
+    controller = ProcessedExcelController()
+    calls = []
+
+    async def backfill():
+        calls.append(True)
+        await mongo.migrations.insert_one({"_id": BACKFILL_MIGRATION_ID})
+        return {"processed_excels": 1, "line_items": 2}
+
+    monkeypatch.setattr(controller, "backfill_line_items", backfill)
+
+    async def escenario():
+        await mongo.processed_excels.insert_one(_cotizacion())
+        with caplog.at_level(logging.WARNING):
+            await controller.ensure_line_items(run_backfill=False)
+        assert "backfill_processed_products" in caplog.text
+        assert calls == []
+
+        await controller.ensure_line_items(run_backfill=True)
+        await controller.ensure_line_items(run_backfill=True)
+        assert calls == [True]
+
+    asyncio.run(escenario())
+
+
+def test_lecturas_de_lineas_esperan_al_backfill(mongo):
+    async def escenario():
+        controller = ProcessedExcelController()
+        with pytest.raises(HTTPException) as error:
+            await controller.search_line_items()
+        assert error.value.status_code == 503
+
+        await mongo.migrations.insert_one({"_id": BACKFILL_MIGRATION_ID})
+        assert (await controller.search_line_items())["total"] == 0
+
+    asyncio.run(escenario())
+
+
+def test_cotizacion_sin_lineas_responde_409(mongo):
+    async def escenario():
+        controller = ProcessedExcelController()
+        await mongo.migrations.insert_one({"_id": BACKFILL_MIGRATION_ID})
+        await mongo.processed_excels.insert_one(_cotizacion())
+        with pytest.raises(HTTPException) as error:
+            await controller.get_line_items("h1")
+        assert error.value.status_code == 409
+
+        await mongo.processed_excels.insert_one({**_cotizacion(), "history_id": "h2", "total_productos": 0})
+        assert (await controller.get_line_items("h2"))["total"] == 0
+
+    asyncio.run(escenario())
@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta
+from services.product_catalog import ProductCatalog
+
+
+def _producto(code: int, updated_at: datetime) -> dict:
+    return {
+        "code": code, "name_excel": f"Producto {code}", "unidad_negocio": "Ferretería",
+        "area1": 1, "activo": True, "created_at": updated_at, "updated_at": updated_at
+    }
+
+
+def test_documentos_invalidos_se_omiten(mongo):
+    async def escenario():
+        now = datetime(2026, 1, 1)
+        await mongo.productos.insert_many([
+            _producto(1, now),
+            {"code": "sin-nombre", "created_at": now, "updated_at": now},
+            _producto(2, now),
+        ])
+        catalog = ProductCatalog(check_seconds=0, max_backoff_seconds=1)
+        await catalog.load()
+        assert sorted(catalog.by_code) == ["1", "2"]
+        assert catalog.stats()["skipped"] == 1
+
+    asyncio.run(escenario())
+
+
+def test_sin_change_stream_detecta_escrituras_de_otro_proceso(mongo):
+    async def escenario():
+        now = datetime(2026, 1, 1)
+        await mongo.productos.insert_one(_producto(1, now))
+        catalog = ProductCatalog(check_seconds=0, max_backoff_seconds=1)
+        await catalog.load()
+
+        # Escritura de otro proceso: este no llama a invalidate()
+        await mongo.productos.insert_one(_producto(2, now + timedelta(seconds=1)))
+        assert await catalog.get_by_code(2) is not None
+
+        await mongo.productos.update_one(
+            {"code": 1}, {"$set": {"activo": False, "updated_at": now + timedelta(seconds=2)}}
+        )
+        assert (await catalog.get_by_code(1)).activo is False
+        assert catalog.reloads == 3
+
+    asyncio.run(escenario())
@@ -0,0 +1,21 @@
+import asyncio
+from services.profiling import StageTimer
+
+
+def test_etapas_con_await_solo_miden_pared():
+    timer = StageTimer()
+
+    async def otra_corrutina():
+        sum(i * i for i in range(300_000))
+
+    async def escenario():
+        with timer.stage("calculo"):
+            sum(i for i in range(10_000))
+        with timer.stage("subida", cpu=False):
+            await asyncio.gather(asyncio.sleep(0.01), otra_corrutina())
+
+    asyncio.run(escenario())
+    calculo, subida = timer.stages
+    assert subida["cpu_seconds"] is None
+    assert subida["wall_seconds"] > 0
+    assert timer.cpu_seconds == calculo["cpu_seconds"]
@@ -0,0 +1,55 @@
+import asyncio
+from io import BytesIO
+import pandas as pd
+from bson import ObjectId
+from fastapi import UploadFile
+from benchmarks.synthetic_quote import write_quote
+from controllers.report_controller import ReportController
+from services.excel_processor import get_df
+from services.report_fragments import frame_to_parquet, parquet_to_frame
+from services.storage import get_storage
+
+
+def _cell_types(df: pd.DataFrame) -> dict:
+    return {column: [type(value) for value in df[column]] for column in df.columns}
+
+
+def test_fragmento_conserva_tipos(tmp_path):
+    df = get_df(write_quote(str(tmp_path / "q.xlsx"), 60, seed=3)).reset_index(drop=True)
+    df.loc[0, "Total"] = "texto"
+    df.loc[1, "Total"] = None
+
+    back = parquet_to_frame(frame_to_parquet(df))
+
+    assert list(back.dtypes) == list(df.dtypes)
+    assert _cell_types(back) == _cell_types(df)
+    pd.testing.assert_frame_equal(back, df)
+
+
+def test_fragmento_de_formato_anterior_se_ignora():
+    buffer = BytesIO()
+    pd.DataFrame({"Total": [1.0, 2.0]}).to_parquet(buffer, index=False)
+    assert parquet_to_frame(buffer.getvalue()) is None
+
+
+def test_ampliar_equivale_a_regenerar(mongo, tmp_path):
+    contents = []
+    for seed in (1, 2):
+        with open(write_quote(str(tmp_path / f"q{seed}.xlsx"), 30, seed=seed), "rb") as f:
+            contents.append(f.read())
+
+    def uploads(*indexes):
+        return [UploadFile(file=BytesIO(contents[i]), filename=f"q{i}.xlsx") for i in indexes]
+
+    async def output(report_id: str) -> pd.DataFrame:
+        report = await mongo.reports.find_one({"_id": ObjectId(report_id)})
+        return pd.read_excel(BytesIO(await get_storage().get_bytes(report["storage_key"])))
+
+    async def escenario():
+        controller = ReportController()
+        full = await controller.generate_report(uploads(0, 1), force=True)
+        partial = await controller.generate_report(uploads(0), force=True)
+        await controller.append_to_report(partial["report_id"], uploads(1))
+        pd.testing.assert_frame_equal(await output(partial["report_id"]), await output(full["report_id"]))
+
+    asyncio.run(escenario())
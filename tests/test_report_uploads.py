@@ -0,0 +1,79 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+import pytest
+from fastapi import UploadFile
+from benchmarks.synthetic_quote import write_quote
+from config import settings
+from controllers.report_controller import ReportController
+from services.report_fragments import parquet_to_frame
+from services.storage import get_storage
+
+
+@pytest.fixture
+def quotes(tmp_path):
+    """Dos cotizaciones distintas con el mismo nombre de archivo"""
+    contents = []
+    for seed, lines in ((1, 20), (2, 35)):
+        path = write_quote(str(tmp_path / f"q{seed}.xlsx"), lines, seed=seed)
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    return contents
+
+
+def _uploads(contents):
+    return [UploadFile(file=BytesIO(content), filename="cotizacion.xlsx") for content in contents]
+
+
+def test_archivos_homonimos_no_comparten_fragmento(mongo, quotes):
+    async def escenario():
+        controller = ReportController()
+        before = set(os.listdir(settings.TEMP_FOLDER))
+        response = await controller.generate_report(_uploads(quotes), force=True, base_url="https://api.example.com/")
+        assert response["processed_files"] == 2
+        assert response["download_url"] == f"https://api.example.com/api/reports/{response['report_id']}/download"
+
+        report = await mongo.reports.find_one({})
+        stages = [stage["stage"] for stage in report["timings"]["stages"]]
+        assert stages[-1] == "fragments"
+        assert report["storage_key"].startswith(f"reports/{report['_id']}/")
+        keys = [f["fragment_key"] for f in report["input_files"]]
+        assert len(set(keys)) == 2
+        storage = get_storage()
+        rows = sorted([len(parquet_to_frame(await storage.get_bytes(key))) for key in keys])
+        assert rows[0] < rows[1]
+        # El directorio de la petición se elimina al terminar
+        assert set(os.listdir(settings.TEMP_FOLDER)) == before
+        return controller, report, keys
+
+    controller, report, keys = asyncio.run(escenario())
+
+    async def borrar():
+        await controller.delete_report(str(report["_id"]))
+        with pytest.raises(FileNotFoundError):
+            await get_storage().get_bytes(keys[0])
+
+    asyncio.run(borrar())
+
+
+def test_prune_libera_fragmentos_antiguos(mongo, quotes):
+    async def escenario():
+        controller = ReportController()
+        await controller.generate_report(_uploads(quotes[:1]), force=True)
+        await controller.generate_report(_uploads(quotes), force=True)
+        old = await mongo.reports.find_one({"files_processed": 1})
+        await mongo.reports.update_one(
+            {"_id": old["_id"]}, {"$set": {"updated_at": datetime.utcnow() - timedelta(days=40)}}
+        )
+
+        result = await controller.prune_fragments(30)
+        assert result == {"reports": 1, "fragments": 1}
+        old = await mongo.reports.find_one({"_id": old["_id"]})
+        assert old["input_files"][0]["fragment_key"] is None
+        # El reporte reciente sigue usando el fragmento compartido
+        recent = await mongo.reports.find_one({"files_processed": 2})
+        for input_file in recent["input_files"]:
+            await get_storage().get_bytes(input_file["fragment_key"])
+
+    asyncio.run(escenario())
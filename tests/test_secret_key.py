@@ -0,0 +1,16 @@
+import pytest
+import config
+
+
+def test_sin_secret_key_falla(monkeypatch):
+    monkeypatch.setattr(config.settings, "SECRET_KEY", None)
+    monkeypatch.setattr(config.settings, "ALLOW_EPHEMERAL_SECRET_KEY", False)
+    with pytest.raises(RuntimeError):
+        config.require_secret_key()
+
+
+def test_clave_efimera_solo_con_permiso(monkeypatch):
+    monkeypatch.setattr(config.settings, "SECRET_KEY", None)
+    monkeypatch.setattr(config.settings, "ALLOW_EPHEMERAL_SECRET_KEY", True)
+    clave = config.require_secret_key()
+    assert clave and config.require_secret_key() == clave
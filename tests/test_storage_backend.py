@@ -0,0 +1,25 @@
+import pytest
+from services.metrics import _Metric
+from services.storage import LocalStorage, MemoryStorage, StorageBackend
+
+
+def test_backends_implementan_la_interfaz(tmp_path):
+    assert isinstance(MemoryStorage(), StorageBackend)
+    assert isinstance(LocalStorage(str(tmp_path)), StorageBackend)
+
+
+def test_backend_incompleto_no_se_instancia():
+    class SinBorrado(StorageBackend):
+        async def put_stream(self, key, stream, content_type=None):
+            return 0
+
+        async def get_bytes(self, key):
+            return b""
+
+        async def signed_url(self, key, expires_in):
+            return ""
+
+    with pytest.raises(TypeError, match="delete"):
+        SinBorrado()
+    with pytest.raises(TypeError, match="samples"):
+        _Metric("metrica", "sin muestras")
@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from controllers.auth_controller import AuthController
+from models.usuario_model import CambiarContrasena, UsuarioCreate
+from services import user_cache as user_cache_module
+from services.token_service import TokenService
+from services.user_cache import UserCache
+
+
+def _nuevo_proceso(monkeypatch):
+    """Controlador y cachés vacíos, como en otro nodo o tras un reinicio"""
+    monkeypatch.setattr(user_cache_module, "user_cache", UserCache(ttl_seconds=300, version_check_seconds=0))
+    import controllers.auth_controller as auth_module
+    monkeypatch.setattr(auth_module, "user_cache", user_cache_module.user_cache)
+    monkeypatch.setattr(auth_module, "token_service", TokenService("clave-de-pruebas", 60, 16))
+    return AuthController()
+
+
+def test_token_revocado_se_rechaza_en_otro_proceso(mongo, monkeypatch):
+    async def escenario():
+        nodo_a = _nuevo_proceso(monkeypatch)
+        usuario = await nodo_a.crear_usuario(UsuarioCreate(
+            nombre="Ana", apellido="Prueba", iniciales="AP", es_lider=False,
+            webhook_bitrix="https://bitrix.example.com/webhook/x", contrasena="secreto1"
+        ))
+        token = nodo_a.crear_token(usuario)
+        assert (await nodo_a.verificar_token(token))["iniciales"] == "AP"
+
+        # El segundo proceso ya validó el token y tiene al usuario en caché
+        nodo_b = _nuevo_proceso(monkeypatch)
+        assert (await nodo_b.verificar_token(token))["iniciales"] == "AP"
+        cache_b = user_cache_module.user_cache
+
+        _nuevo_proceso(monkeypatch)
+        await AuthController().cambiar_contrasena(
+            str(usuario["_id"]),
+            CambiarContrasena(contrasena_actual="secreto1", contrasena_nueva="secreto2")
+        )
+
+        # El nodo B se entera por el documento de versión compartido
+        import controllers.auth_controller as auth_module
+        monkeypatch.setattr(auth_module, "user_cache", cache_b)
+        with pytest.raises(HTTPException) as error:
+            await nodo_b.verificar_token(token)
+        assert error.value.status_code == 401
+
+        # Y un proceso nuevo, sin caché, lo lee del documento del usuario
+        nodo_c = _nuevo_proceso(monkeypatch)
+        with pytest.raises(HTTPException):
+            await nodo_c.verificar_token(token)
+
+    asyncio.run(escenario())
+
+
+def test_usuario_inactivo_invalida_el_token(mongo, monkeypatch):
+    async def escenario():
+        nodo = _nuevo_proceso(monkeypatch)
+        usuario = await nodo.crear_usuario(UsuarioCreate(
+            nombre="Beto", apellido="Prueba", iniciales="BP", es_lider=False,
+            webhook_bitrix="https://bitrix.example.com/webhook/x", contrasena="secreto1"
+        ))
+        token = nodo.crear_token(usuario)
+        await mongo.usuarios.update_one({"_id": usuario["_id"]}, {"$set": {"activo": False}})
+
+        with pytest.raises(HTTPException):
+            await _nuevo_proceso(monkeypatch).verificar_token(token)
+
+    asyncio.run(escenario())
+
+
+def _crear_usuario(nodo: AuthController, iniciales: str):
+    return nodo.crear_usuario(UsuarioCreate(
+        nombre="Ceci", apellido="Prueba", iniciales=iniciales, es_lider=False,
+        webhook_bitrix="https://bitrix.example.com/webhook/x", contrasena="secreto1"
+    ))
+
+
+def test_cambio_de_contrasena_no_usa_hash_en_cache(mongo, monkeypatch):
+    async def escenario():
+        nodo_a = _nuevo_proceso(monkeypatch)
+        usuario = await _crear_usuario(nodo_a, "CP")
+        usuario_id = str(usuario["_id"])
+
+        # Nodo B con el usuario en caché y sin consultar la versión compartida
+        import controllers.auth_controller as auth_module
+        cache_b = UserCache(ttl_seconds=300, version_check_seconds=3600)
+        cache_b.put(usuario)
+        await nodo_a.cambiar_contrasena(
+            usuario_id, CambiarContrasena(contrasena_actual="secreto1", contrasena_nueva="secreto2")
+        )
+        monkeypatch.setattr(auth_module, "user_cache", cache_b)
+        assert await AuthController().cambiar_contrasena(
+            usuario_id, CambiarContrasena(contrasena_actual="secreto2", contrasena_nueva="secreto3")
+        )
+
+    asyncio.run(escenario())
+
+
+def test_cambio_concurrente_responde_409(mongo, monkeypatch):
+    async def escenario():
+        nodo = _nuevo_proceso(monkeypatch)
+        usuario = await _crear_usuario(nodo, "DP")
+        hashear = nodo.hashear_contrasena
+
+        async def hashear_y_perder_la_carrera(contrasena):
+            # Otro nodo cambia la contraseña entre la verificación y la escritura
+            await mongo.usuarios.update_one({"_id": usuario["_id"]}, {"$set": {"contrasena_hash": "otro"}})
+            return await hashear(contrasena)
+
+        monkeypatch.setattr(nodo, "hashear_contrasena", hashear_y_perder_la_carrera)
+        with pytest.raises(HTTPException) as error:
+            await nodo.cambiar_contrasena(
+                str(usuario["_id"]), CambiarContrasena(contrasena_actual="secreto1", contrasena_nueva="secreto2")
+            )
+        assert error.value.status_code == 409
+
+    asyncio.run(escenario())